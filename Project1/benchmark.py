@@ -0,0 +1,209 @@
+"""
+COMP30024 Artificial Intelligence, Semester 1 2019
+Benchmarks for Project Part A: Searching
+
+Authors: Xinyao Niu (900721), Maoting Zuo (901116)
+Team Name: VanGame
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import utils
+import travel
+import generator
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+
+# the bidirectional search expands other nodes, so it has a baseline of its own
+BIDIRECTIONAL_BASELINE = os.path.join(os.path.dirname(BASELINE), "baseline-bidirectional.json")
+
+
+def node_memory(data: dict, nodes: int = 20000) -> float:
+    """
+    bytes allocated per generated node, measured by expanding the tree
+    level by level (and keeping every node alive, like A* does) until at
+    least `nodes` nodes are generated
+
+    * data -- the input board which read from the json file
+    * nodes -- how many nodes should be generated
+    """
+
+    root = utils.root_init(data)
+    if root is None:
+        raise ValueError("the puzzle has no solution")
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    generated = []
+    layer = [root]
+
+    while layer and len(generated) < nodes:
+        next_layer = []
+        for n in layer:
+            next_layer += n.expand()
+        generated += next_layer
+        layer = next_layer
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / len(generated)
+
+
+def solve(data: dict, pairs: bool = True, bidirectional: bool = False) -> tuple:
+    """
+    run Travel.Astar_Q (or Travel.bidirectional) once without printing
+    anything, return (number of expanded nodes, solution length)
+    """
+
+    root = utils.root_init(data, pairs=pairs)
+    if root is None:
+        # no solution, nothing to expand
+        return 0, 0
+
+    t = travel.Travel(root)
+
+    if bidirectional:
+        actions = t.bidirectional()
+        # no solution counts as 0 steps, same as A* below
+        return t.explored, len(actions) if actions is not None else 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        last = t.Astar_Q()
+
+    steps = 0
+    while last is not None and last != root:
+        steps += 1
+        last = last.pre_node
+
+    return t.explored, steps
+
+
+def run(data: dict, pairs: bool = True, bidirectional: bool = False) -> dict:
+    """
+    expansions, time (s), peak traced memory (KB) and solution length for
+    one puzzle. Time is measured without tracemalloc, since tracing slows
+    the search down a lot, so the puzzle is solved twice.
+    """
+
+    start = time.perf_counter()
+    expanded, steps = solve(data, pairs, bidirectional)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    solve(data, pairs, bidirectional)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "expanded": expanded,
+        "time": round(elapsed, 4),
+        "memory": round(peak / 1024, 1),
+        "steps": steps
+    }
+
+
+def run_suite(seeds: int = 3, pairs: bool = True, bidirectional: bool = False) -> dict:
+    """
+    results of every generated puzzle, keyed by the puzzle name
+    """
+
+    results = {}
+
+    for name, data in generator.suite(seeds).items():
+        # tables are memoised, do not let a previous run build them for free
+        utils._cost_table.cache_clear()
+        utils._pair_table.cache_clear()
+
+        results[name] = run(data, pairs, bidirectional)
+        print("#", name.ljust(16), results[name])
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 1.5, slack: float = 0.05) -> list:
+    """
+    names of the puzzles which got worse than the baseline: more expansions,
+    a longer solution, or more than `tolerance` times its time or memory.
+    `slack` seconds are added to the time limit, timing of tiny puzzles is noisy
+    """
+
+    regressions = []
+
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        b = baseline[name]
+        if r["expanded"] > b["expanded"] or r["steps"] > b["steps"] \
+                or r["time"] > tolerance * b["time"] + slack \
+                or r["memory"] > tolerance * b["memory"]:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks for the part A solver")
+    commands = parser.add_subparsers(dest="command")
+
+    memory = commands.add_parser("memory", help="bytes per generated node")
+    memory.add_argument("file", nargs="?", default="test.json",
+                        help="puzzle used for the benchmark (json)")
+    memory.add_argument("--nodes", type=int, default=20000,
+                        help="number of nodes to generate")
+
+    suite = commands.add_parser("suite", help="solve the generated puzzle set")
+    suite.add_argument("--seeds", type=int, default=3,
+                       help="number of puzzles for each colour and level")
+    suite.add_argument("--no-pairs", action="store_true",
+                       help="do not use the pair pattern database in the heuristic")
+    suite.add_argument("--bidirectional", action="store_true",
+                       help="use bidirectional search instead of A*")
+    suite.add_argument("--baseline", default=None,
+                       help="reference results to compare with (default one for each search)")
+    suite.add_argument("--save", action="store_true",
+                       help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        with open(args.file) as file:
+            data = json.load(file)
+        print("# bytes per generated node =", round(node_memory(data, args.nodes), 1))
+
+    elif args.command == "suite":
+        results = run_suite(args.seeds, not args.no_pairs, args.bidirectional)
+
+        baseline = args.baseline
+        if baseline is None:
+            baseline = BIDIRECTIONAL_BASELINE if args.bidirectional else BASELINE
+
+        print("# total expanded =", sum(r["expanded"] for r in results.values()))
+        print("# total time =", round(sum(r["time"] for r in results.values()), 3))
+
+        if args.save:
+            os.makedirs(os.path.dirname(baseline), exist_ok=True)
+            with open(baseline, "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        elif os.path.exists(baseline):
+            with open(baseline) as file:
+                regressions = compare(results, json.load(file))
+            print("# regressions =", regressions)
+
+            # so scripts running the suite can tell
+            if regressions:
+                sys.exit(1)
+
+    else:
+        parser.print_help()
+
+
+# when this module is executed, run the `main` function:
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+COMP30024 Artificial Intelligence, Semester 1 2019
+Puzzle generator for Project Part A: Searching
+
+Authors: Xinyao Niu (900721), Maoting Zuo (901116)
+Team Name: VanGame
+"""
+
+import argparse
+import json
+import os
+import random
+import utils
+
+# (number of pieces, number of blocks, lowest cost of a piece to its closest goal)
+# for each difficulty
+LEVELS = {
+    "easy": (2, 3, 1),
+    "medium": (3, 6, 3),
+    "hard": (4, 9, 4)
+}
+
+COLOURS = ["red", "green", "blue"]
+
+
+def generate(seed: int, colour: str, level: str) -> dict:
+    """
+    random puzzle in the same format as the input json file, the same
+    seed, colour and level always give the same puzzle. Only solvable
+    puzzles are returned (every piece can reach a goal around the blocks),
+    harder levels have more pieces and blocks, and pieces further away
+    """
+
+    rnd = random.Random(str(seed) + colour + level)
+    pieces, blocks, distance = LEVELS[level]
+
+    while True:
+        cells = rnd.sample(utils.CELL_LIST, pieces + blocks)
+        players = cells[:pieces]
+        block = cells[pieces:]
+
+        if not utils.achievable_goals(colour, block):
+            continue
+
+        # harder puzzles start far away from the goals
+        cost = utils.cost_table(colour, block)
+        if all(p in cost and cost[p] >= distance for p in players):
+            return {
+                "colour": colour,
+                "pieces": [list(p) for p in sorted(players)],
+                "blocks": [list(b) for b in sorted(block)]
+            }
+
+
+def suite(seeds: int = 3) -> dict:
+    """
+    the benchmark puzzle set, `seeds` puzzles for each colour and level,
+    keyed by "level-colour-seed"
+    """
+
+    puzzles = {}
+
+    for level in LEVELS:
+        for colour in COLOURS:
+            for seed in range(seeds):
+                puzzles[level + "-" + colour + "-" + str(seed)] = generate(seed, colour, level)
+
+    return puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate random part A puzzles")
+    parser.add_argument("directory", help="where to write the puzzles (json)")
+    parser.add_argument("--seeds", type=int, default=3,
+                        help="number of puzzles for each colour and level")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+
+    for name, data in suite(args.seeds).items():
+        with open(os.path.join(args.directory, name + ".json"), "w") as file:
+            json.dump(data, file)
+
+
+# when this module is executed, run the `main` function:
+if __name__ == '__main__':
+    main()
@@ -15,18 +15,22 @@ class Node:
         Team Name: VanGame
     """
 
+    # nodes are created millions of times, so no __dict__ for them
+    __slots__ = ("action", "pre_node", "g", "state", "f")
+
     def __init__(self, pre_node: 'node' = None, state: dict = {},
-                 transition_action: str = "", g=0) -> None:
+                 action: int = 0, g=0) -> None:
         """
             constructor
             * pre_node -- parent node on the tree (None by default)
             * state -- current state (empty by default)
-            * transition_action -- output string for this node, will be used in backtrace
+            * action -- packed action from the parent node (see utils.pack_action),
+                        only formatted into a string in backtrace
             * g -- cost so far to achieve this state
         """
 
-        # string of the action that how state are transfer from last node to this node
-        self.transition_action = transition_action
+        # packed action that how state are transfer from last node to this node
+        self.action = action
         self.pre_node = pre_node
         self.g = g
         self.state = state
@@ -34,6 +38,13 @@ class Node:
         # calculate heuristic when initializing the node
         self.f = self.g + self.heuristic(self.state)
 
+    @property
+    def transition_action(self) -> str:
+        """
+            output string for this node, will be used in backtrace
+        """
+        return utils.format_action(self.action)
+
     def __lt__(self, other):
         """
             function override for using comparision operators.
@@ -59,12 +70,16 @@ class Node:
 
         for p in state["players"]:
 
-            min_distance_from_goal = utils.COST[p]
+            min_distance_from_goal = state["cost"][p]
             h = h + min_distance_from_goal
 
+        # pieces interact with each other, take the tighter one
+        if state.get("pairs") is not None:
+            h = max(h, utils.pair_heuristic(state["players"], state["pairs"]))
+
         return h
 
-    def _newNode(self, old_coord: tuple, new_coord: tuple = None, transition_action=""):
+    def _newNode(self, old_coord: tuple, new_coord: tuple = None, action=0):
         """
             private (well..)function for generating new nodes
         """
@@ -81,9 +96,11 @@ class Node:
 
         new_state["goals"] = self.state["goals"]
         new_state["blocks"] = self.state["blocks"]
+        new_state["cost"] = self.state["cost"]
+        new_state["pairs"] = self.state["pairs"]
 
         new_node = Node(self, new_state, g=(self.g + 1),
-                        transition_action=transition_action)
+                        action=action)
 
         return new_node
 
@@ -128,7 +145,7 @@ class Node:
             # if piece is on the goal then exit
             if tmpPiece in self.state["goals"]:
                 s = self._newNode(tmpPiece,
-                                  transition_action="EXIT from " + str(tmpPiece) + ".")
+                                  action=utils.pack_action(utils.EXIT, tmpPiece))
                 successors.append(s)
                 continue
 
@@ -148,10 +165,7 @@ class Node:
                     # if can reach this direction one step by move
                     # create new node
                     s = self._newNode(tmpPiece, check_move,
-                                      transition_action="MOVE from " + str(tmpPiece)
-                                                        +
-                                                        " to " + str(check_move) + ".",
-                                      )
+                                      action=utils.pack_action(utils.MOVE, tmpPiece, check_move))
                     successors.append(s)
                 else:
                     # by jump (if 1 step move in this direction can not
@@ -166,9 +180,7 @@ class Node:
                         # if can reach this direction one step by jump
                         # create new node
                         s = self._newNode(tmpPiece, check_jump,
-                                          transition_action="JUMP from " + str(tmpPiece)
-                                                            + " to " + str(check_jump) + ".",
-                                          )
+                                          action=utils.pack_action(utils.JUMP, tmpPiece, check_jump))
                         successors.append(s)
 
         return successors
@@ -214,7 +226,9 @@ if __name__ == "__main__":
     thatShitNode = Node(state={
         "players": [(0, 2), (2, 1)],
         "goals": [(3, 0), (2, 1), (1, 2), (0, 3)],
-        "blocks": [(2, -1)]
+        "blocks": [(2, -1)],
+        "cost": utils.cost_table("red", [(2, -1)]),
+        "pairs": None
     })
 
     print(thatShitNode.expand())
\ No newline at end of file
@@ -6,33 +6,61 @@ Authors: Xinyao Niu (900721), Maoting Zuo (901116)
 Team Name: VanGame
 """
 
-import sys
+import argparse
 import json
 import utils
 import travel
 
 
 def main():
-    if len(sys.argv) >= 2:
-        with open(sys.argv[1]) as file:
-            data = json.load(file)
+    parser = argparse.ArgumentParser(description="solve a single player Chexers puzzle")
+    parser.add_argument("file", nargs="?", default="test.json",
+                        help="puzzle to solve (json)")
+    parser.add_argument("--cache", metavar="DIR", default=None,
+                        help="directory to keep distance tables between runs")
+    parser.add_argument("--no-pairs", action="store_true",
+                        help="do not use the pair pattern database in the heuristic")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="use bidirectional search instead of A*")
+    args = parser.parse_args()
+
+    with open(args.file) as file:
+        data = json.load(file)
+
+    root = utils.root_init(data, cache_dir=args.cache, pairs=not args.no_pairs)
+
+    # a piece cannot reach any goal
+    if root is None:
+        print("#", travel.FAILURE)
+        return
+
+    t = travel.Travel(root)
+
+    if args.bidirectional:
+        actions = t.bidirectional()
+        print("# explored node =", t.explored)
     else:
-        with open("test.json") as file:
-            data = json.load(file)
+        # return the goal state (node) so that we can back trace to get the result
+        last = t.Astar_Q()
 
-    root = utils.root_init(data)
+        actions = None
+        if last is not None:
+            actions = []
+            while last != root:
+                actions.insert(0, last.action)
+                last = last.pre_node
 
-    # return the goal state (node) so that we can back trace to get the result
-    last = travel.Travel(root).Astar_Q()
+    # both searches give None when the pieces cannot all exit
+    if actions is None:
+        print("#", t.fa)
+        return
 
-    total_steps = 0
+    total_steps = len(actions)
 
     moves = ""
 
-    while last != root:
-        total_steps += 1
-        moves = last.transition_action + "\n" + moves
-        last = last.pre_node
+    for a in actions:
+        moves = moves + utils.format_action(a) + "\n"
 
     print("# total steps are:", total_steps)
     print(moves)
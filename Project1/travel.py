@@ -1,4 +1,8 @@
 from heapq import heappush, heappop
+import utils
+
+# printed when a puzzle has no solution
+FAILURE = "Failure"
 
 
 class Travel:
@@ -9,7 +13,11 @@ class Travel:
     def __init__(self, root):
         self.root = root
         self.infi = 999  # maximum possible movement if there is really a solution
-        self.fa = "Failure"
+        self.fa = FAILURE
+
+        # statistics of the last search, used by the benchmarks
+        self.explored = 0
+        self.removed = 0
 
     def Astar_Q(self) -> 'node':
         """
@@ -29,16 +37,20 @@ class Travel:
             heappush(front, s)
             visited[tuple(sorted(s.state["players"]))] = s
 
-        while True:
+        while front:
             current_node = heappop(front)
 
             if current_node.goal_test():
+                self.explored = explored
+                self.removed = removed
                 print("# total removed duplicate nodes =", removed)
                 print("# current PQ size =", len(front))
                 print("# explored node =", explored)
                 return current_node
 
             if current_node.f > self.infi:
+                self.explored = explored
+                self.removed = removed
                 return None
 
             successors = current_node.expand()
@@ -57,3 +69,141 @@ class Travel:
                 else:
                     heappush(front, s)
                     visited[state] = s
+
+        # every reachable state is explored without reaching the goal
+        self.explored = explored
+        self.removed = removed
+        return None
+
+    def bidirectional(self) -> list:
+        """
+        bidirectional breadth first search, a forward frontier grows from
+        the root and a backward frontier grows from the goal (all pieces
+        exited, then pieces coming back on the goals). Each round expands a
+        whole layer of the smaller frontier; once the frontiers meet, the
+        best meeting state of that layer gives an optimal solution, since
+        every action costs 1.
+
+        return the packed actions from the root to the goal, or None if
+        there is no solution
+        """
+
+        start = tuple(sorted(self.root.state["players"]))
+        goal = ()
+
+        # state -> (state one step closer to that side's root, packed action)
+        parents = [{start: None}, {goal: None}]
+        depth = [{start: 0}, {goal: 0}]
+        fronts = [[start], [goal]]
+        steps = [self._forward, self._backward]
+
+        self.explored = 0
+
+        if start == goal:
+            return []
+
+        while fronts[0] and fronts[1]:
+            # 0 for forward, 1 for backward
+            side = 0 if len(fronts[0]) <= len(fronts[1]) else 1
+            other = 1 - side
+
+            best = None
+            next_front = []
+
+            for state in fronts[side]:
+                self.explored += 1
+
+                for child, action in steps[side](state):
+                    if child in depth[side]:
+                        continue
+
+                    depth[side][child] = depth[side][state] + 1
+                    parents[side][child] = (state, action)
+                    next_front.append(child)
+
+                    if child in depth[other]:
+                        total = depth[side][child] + depth[other][child]
+                        if best is None or total < depth[side][best] + depth[other][best]:
+                            best = child
+
+            if best is not None:
+                return self._join(best, parents)
+
+            fronts[side] = next_front
+
+        return None
+
+    def _forward(self, state: tuple) -> list:
+        """
+            successors of a state, the same actions as Node.expand
+        """
+
+        goals = self.root.state["goals"]
+        occupied = self.root.state["blocks"] | set(state)
+        successors = []
+
+        for piece in state:
+            rest = [p for p in state if p != piece]
+
+            if piece in goals:
+                successors.append((tuple(rest),
+                                   utils.pack_action(utils.EXIT, piece)))
+                continue
+
+            for coord, flag in utils.find_next(piece, None, occupied):
+                action_type = utils.MOVE if flag == 1 else utils.JUMP
+                successors.append((tuple(sorted(rest + [coord])),
+                                   utils.pack_action(action_type, piece, coord)))
+
+        return successors
+
+    def _backward(self, state: tuple) -> list:
+        """
+            predecessors of a state, together with the (forward) action
+            leading from the predecessor to this state. MOVE and JUMP are
+            symmetric, so utils.find_next gives them as well, except that a
+            piece on a goal always exits, so it could not have moved away.
+        """
+
+        goals = self.root.state["goals"]
+        occupied = self.root.state["blocks"] | set(state)
+        predecessors = []
+
+        # the reverse of EXIT, a piece comes back on a free goal
+        if len(state) < len(self.root.state["players"]):
+            for g in goals:
+                if g not in occupied:
+                    predecessors.append((tuple(sorted(state + (g, ))),
+                                         utils.pack_action(utils.EXIT, g)))
+
+        for piece in state:
+            rest = [p for p in state if p != piece]
+
+            for coord, flag in utils.find_next(piece, None, occupied):
+                if coord in goals:
+                    continue
+                action_type = utils.MOVE if flag == 1 else utils.JUMP
+                predecessors.append((tuple(sorted(rest + [coord])),
+                                     utils.pack_action(action_type, coord, piece)))
+
+        return predecessors
+
+    @staticmethod
+    def _join(meet: tuple, parents: list) -> list:
+        """
+            actions from the root to the meeting state, then from there to the goal
+        """
+
+        actions = []
+
+        state = meet
+        while parents[0][state] is not None:
+            state, action = parents[0][state]
+            actions.insert(0, action)
+
+        state = meet
+        while parents[1][state] is not None:
+            state, action = parents[1][state]
+            actions.append(action)
+
+        return actions
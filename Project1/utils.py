@@ -1,11 +1,44 @@
-import queue
 import node, json
+import os
+import types
+import hashlib
+import functools
+import collections
 
 # define the boundary of the board
 CELLS = set([(q, r) for q in range(-3, +3 + 1) for r in range(-3, +3 + 1) if -q - r in range(-3, +3 + 1)])
 
-# steps requirement for one piece move from any grid to the closest destination
-COST = {}
+# index of every grid, used to pack an action into a small integer
+CELL_LIST = sorted(CELLS)
+CELL_ID = {c: i for i, c in enumerate(CELL_LIST)}
+
+# type of the action, stored in the highest bits of a packed action
+MOVE = 1
+JUMP = 2
+EXIT = 3
+ACTION_NAMES = {MOVE: "MOVE", JUMP: "JUMP", EXIT: "EXIT"}
+
+# goals of players in each color
+GOALS = {
+    "red": [
+        (3, -3),
+        (3, -2),
+        (3, -1),
+        (3, 0)
+    ],
+    "green": [
+        (-3, 3),
+        (-2, 3),
+        (-1, 3),
+        (0, 3)
+    ],
+    "blue": [
+        (0, -3),
+        (-1, -2),
+        (-2, -1),
+        (-3, 0)
+    ]
+}
 
 
 def print_board(board_dict: dict, message: str = "", debug: bool = False, **kwargs) -> None:
@@ -90,6 +123,27 @@ def print_board(board_dict: dict, message: str = "", debug: bool = False, **kwar
     print(board, **kwargs)
 
 
+# delta x and y from any position to its neighbourhood
+DIRECTIONS = [
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 1),
+    (-1, 0)
+]
+
+
+# STEPS[cell] = [(neighbour, jump landing), ...] in DIRECTIONS order, None when off the board
+STEPS = {}
+for _c in CELLS:
+    STEPS[_c] = []
+    for _d in DIRECTIONS:
+        _m = (_c[0] + _d[0], _c[1] + _d[1])
+        _j = (_c[0] + 2 * _d[0], _c[1] + 2 * _d[1])
+        STEPS[_c].append((_m if _m in CELLS else None, _j if _j in CELLS else None))
+
+
 def piece_valid(piece: tuple) -> bool:
     """
     return True only if the given piece are still on the board or
@@ -146,76 +200,247 @@ def find_next(piece: tuple, parent: tuple, blocks: list) -> list:
     return next_coords
 
 
-def root_init(input_board: dict) -> 'node':
+def pack_action(action_type: int, from_coord: tuple, to_coord: tuple = None) -> int:
+    """
+    pack an action into one integer: (type, from grid id, to grid id),
+    6 bits are enough for each of the 37 grid ids
+    """
+
+    to_id = CELL_ID[to_coord] if to_coord is not None else 0
+
+    return (action_type << 12) | (CELL_ID[from_coord] << 6) | to_id
+
+
+def format_action(action: int) -> str:
+    """
+    output string of a packed action, only needed when back tracing
+    the solution
+    """
+
+    action_type = action >> 12
+
+    if action_type == 0:
+        return ""
+
+    from_coord = CELL_LIST[(action >> 6) & 63]
+
+    if action_type == EXIT:
+        return "EXIT from " + str(from_coord) + "."
+
+    to_coord = CELL_LIST[action & 63]
+
+    return ACTION_NAMES[action_type] + " from " + str(from_coord) + " to " + str(to_coord) + "."
+
+
+def root_init(input_board: dict, cache_dir: str = None, pairs: bool = True) -> 'node':
     """
     the root of the tree will be init here
 
     `inputBoard` -- the input board which read from the json file
+    `cache_dir` -- optional directory for persisting the distance tables
+    `pairs` -- also use the pair pattern database in the heuristic
+
+    return None if the puzzle cannot be solved: every goal is covered by a
+    block, or a piece cannot reach any of them (it has no cost)
     """
 
-    COLOURS = {
-        "red": [
-            (3, -3),
-            (3, -2),
-            (3, -1),
-            (3, 0)
-        ],
-        "green": [
-            (-3, 3),
-            (-2, 3),
-            (-1, 3),
-            (0, 3)
-        ],
-        "blue": [
-            (0, -3),
-            (-1, -2),
-            (-2, -1),
-            (-3, 0)
-        ]
-    }
+    blocks = set([tuple(x) for x in input_board["blocks"]])
+    players = set([tuple(x) for x in input_board["pieces"]])
+    goals = achievable_goals(input_board["colour"], blocks)
+    cost = cost_table(input_board["colour"], blocks, cache_dir)
+
+    if players and (not goals or any(p not in cost for p in players)):
+        return None
 
     initial_state = {
-        "players": set([tuple(x) for x in input_board["pieces"]]),
-        "goals": COLOURS[input_board["colour"]],
-        "blocks": set([tuple(x) for x in input_board["blocks"]])
+        "players": players,
+        # remove unachievable goals
+        "goals": goals,
+        "blocks": blocks,
+        # steps requirement for one piece move from any grid to the closest destination
+        "cost": cost,
+        # exact cost for every pair of pieces, None if it is not used
+        "pairs": pair_table(input_board["colour"], blocks) if pairs else None
     }
 
-    # remove unachievable goals
-    for i in initial_state["blocks"]:
-        if i in initial_state['goals']:
-            initial_state['goals'].remove(i)
-
-    for g in initial_state['goals']:
-        cost_from_goal(g, initial_state["blocks"])
-
     initial_root = node.Node(state=initial_state)
 
     return initial_root
 
 
-def cost_from_goal(goal: tuple, block: list) -> None:
+def achievable_goals(colour: str, blocks) -> list:
+    """
+    goals of the given colour which are not covered by a block
+    """
+
+    return [g for g in GOALS[colour] if g not in blocks]
+
+
+def cost_table(colour: str, blocks, cache_dir: str = None) -> 'types.MappingProxyType':
+    """
+    read only table of the cost from any reachable grid to the closest goal
+    of `colour`, with the given blocks on board.
+
+    tables are only built once for the same (colour, blocks) in a process,
+    and if `cache_dir` is given, they are also stored there (one small json
+    file per block set) so that the next run can skip the BFS.
+    """
+
+    return _cost_table(colour, frozenset(tuple(b) for b in blocks), cache_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def _cost_table(colour: str, blocks: frozenset, cache_dir: str) -> 'types.MappingProxyType':
+    """
+    memoised body of cost_table, `blocks` has to be hashable here
+    """
+
+    path = None
+
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, _cache_name(colour, blocks))
+
+        if os.path.exists(path):
+            with open(path) as f:
+                return types.MappingProxyType({(q, r): h for q, r, h in json.load(f)})
+
+    cost = {}
+
+    for g in achievable_goals(colour, blocks):
+        cost_from_goal(g, blocks, cost)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump([[p[0], p[1], cost[p]] for p in sorted(cost)], f)
+
+    return types.MappingProxyType(cost)
+
+
+def _cache_name(colour: str, blocks: frozenset) -> str:
+    """
+    file name of the cached table, keyed by the colour and the block set
+    """
+
+    key = colour + str(sorted(blocks))
+
+    return colour + "-" + hashlib.sha1(key.encode()).hexdigest()[:16] + ".json"
+
+
+def pair_table(colour: str, blocks) -> 'types.MappingProxyType':
+    """
+    pattern database over pairs of pieces against the fixed blocks.
+
+    the value of (a, b) is the fewest actions for two pieces on grid a and
+    b to both exit, when a JUMP is allowed over any grid (other pieces may
+    be there) and they only can not land on a block or on each other.
+    (a, None) is the same for a single piece. Each action moves a single
+    piece, so the sum over disjoint pairs never overestimates.
+    """
+
+    return _pair_table(colour, frozenset(tuple(b) for b in blocks))
+
+
+@functools.lru_cache(maxsize=None)
+def _pair_table(colour: str, blocks: frozenset) -> 'types.MappingProxyType':
+    """
+    memoised body of pair_table, the BFS starts from both pieces exited
+    and goes backward, every relaxed action can be reversed
+    """
+
+    goals = achievable_goals(colour, blocks)
+
+    # grids reached by moving one or two grids in any direction
+    reach = {}
+    for c in CELLS:
+        if c not in blocks:
+            reach[c] = [n for n in [(c[0] + k * d[0], c[1] + k * d[1]) for d in DIRECTIONS for k in (1, 2)]
+                        if piece_valid(n) and n not in blocks]
+
+    cost = {(None, None): 0}
+    q = collections.deque([(None, None)])
+
+    while q:
+        current = q.popleft()
+        child_cost = cost[current] + 1
+
+        # one piece takes the action (backward), the other one stays
+        for mover, stay in (current, current[::-1]):
+            if mover is None:
+                # the reverse of EXIT, come back on a goal
+                previous = goals
+            else:
+                previous = reach[mover]
+
+            for p in previous:
+                if p == stay or (p, stay) in cost:
+                    continue
+                cost[(p, stay)] = child_cost
+                cost[(stay, p)] = child_cost
+                q.append((p, stay))
+
+    return types.MappingProxyType(cost)
+
+
+def pair_heuristic(players, pairs) -> int:
     """
-    Receive a goal coordinate and block list then calculate a pre
+    best sum of the pair costs over all the ways to match the pieces
+    into disjoint pairs (one piece is left alone for odd numbers)
     """
 
-    q = queue.Queue()
+    players = list(players)
+
+    if len(players) == 0:
+        return 0
+
+    if len(players) == 1:
+        return pairs[(players[0], None)]
+
+    first = players[0]
+    best = 0
+
+    for i in range(1, len(players)):
+        rest = players[1:i] + players[i + 1:]
+        best = max(best, pairs[(first, players[i])] + pair_heuristic(rest, pairs))
+
+    if len(players) % 2 == 1:
+        best = max(best, pairs[(first, None)] + pair_heuristic(players[1:], pairs))
+
+    return best
+
+
+def cost_from_goal(goal: tuple, block, cost: dict) -> None:
+    """
+    Receive a goal coordinate and block list then calculate the cost
+    from every reachable grid to this goal, `cost` keeps the lowest
+    one among all the goals that have been calculated so far
+    """
+
+    q = collections.deque()
 
     # (cost_from_goal, ((MOVE_counter, JUMP_counter), coordinates))
-    q.put((0, ((0, 0), goal)))
+    q.append((0, ((0, 0), goal)))
 
-    cost = {goal: 0}
+    visited = {goal: 0}
 
-    COST[goal] = 1
+    cost[goal] = 1
 
-    while not q.empty():
+    while q:
 
-        current = q.get()
+        current = q.popleft()
+
+        # same as find_next(current, None, block), over the precomputed steps
+        successors = []
+        for m, j in STEPS[current[1][1]]:
+            if m is not None and m not in block:
+                successors.append((m, 1))
+            elif j is not None and j not in block:
+                successors.append((j, 2))
 
-        successors = find_next(current[1][1], None, block)
         child_cost = current[0] + 1
 
         for s in successors:
-            if s[0] not in cost:
+            if s[0] not in visited:
                 # since we are using BFS to findNext the coordinates
                 # better solution will be always expanded first
 
@@ -229,8 +454,8 @@ def cost_from_goal(goal: tuple, block: list) -> None:
                 elif s[1] == 2:
                     s_counter = (current[1][0][0], current[1][0][1] + 1)
 
-                q.put((child_cost, (s_counter, s[0])))
-                cost[s[0]] = child_cost
+                q.append((child_cost, (s_counter, s[0])))
+                visited[s[0]] = child_cost
 
                 # if the cost less then update the closest cost
                 h = 0
@@ -240,11 +465,9 @@ def cost_from_goal(goal: tuple, block: list) -> None:
                 else:
                     h = h + ((s_counter[0] - 1) / 2 + s_counter[1] + 2)
 
-                if s[0] not in COST:
-                    COST[s[0]] = h
-                elif COST[s[0]] > h:
-                    COST[s[0]] = h
+                if s[0] not in cost:
+                    cost[s[0]] = h
+                elif cost[s[0]] > h:
+                    cost[s[0]] = h
 
     return
-        
-
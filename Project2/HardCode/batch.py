@@ -0,0 +1,315 @@
+import HardCode.config as config
+import HardCode.utils as utils
+import numpy as np
+import time
+
+'''
+    many games at once.
+
+    N boards are kept in an int8 array of shape (N, 37), cell i being
+    config.CELLS[i] and the value its config.P_MAPPING (0 empty, 1 red,
+    2 green, 3 blue). neighbours and jump landings are precomputed as
+    (37, 6) index arrays, so legal moves of all the boards come from a few
+    gathers instead of find_next on every piece of every board.
+
+    actions are integers in [0, N_ACTIONS):
+        MOVE  cell * 6 + d
+        JUMP  JUMP_BASE + cell * 6 + d
+        EXIT  EXIT_BASE + cell
+        PASS  PASS_ACTION
+'''
+
+N_CELLS = len(config.CELLS)
+
+# colours as stored on the boards, index + 1 is the value
+COLOURS = ["red", "green", "blue"]
+
+# delta x and y from any position to its neighbourhood
+DIRECTIONS = [
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 1),
+    (-1, 0)
+]
+
+JUMP_BASE = N_CELLS * 6
+EXIT_BASE = N_CELLS * 12
+PASS_ACTION = N_CELLS * 13
+N_ACTIONS = PASS_ACTION + 1
+
+# same as referee (256 turns per player)
+MAX_TURNS = 256 * 3
+
+# off the board neighbours point at the extra column N_CELLS of a padded board
+OFF = N_CELLS
+
+NEIGHBOUR = np.full((N_CELLS, 6), OFF, dtype=np.intp)
+JUMP = np.full((N_CELLS, 6), OFF, dtype=np.intp)
+
+for _i, _c in enumerate(config.CELLS):
+    for _d, (_dq, _dr) in enumerate(DIRECTIONS):
+        NEIGHBOUR[_i, _d] = config.CELL_ID.get((_c[0] + _dq, _c[1] + _dr), OFF)
+        JUMP[_i, _d] = config.CELL_ID.get((_c[0] + 2 * _dq, _c[1] + 2 * _dr), OFF)
+
+# GOAL[k] is True on the goal cells of colour k + 1
+GOAL = np.zeros((3, N_CELLS), dtype=bool)
+for _k, _c in enumerate(COLOURS):
+    GOAL[_k, [config.CELL_ID[g] for g in config.GOALS[_c]]] = True
+
+# where every MOVE / JUMP action starts and lands
+_cells = np.repeat(np.arange(N_CELLS), 6)
+SOURCE = np.concatenate([_cells, _cells, np.arange(N_CELLS)])
+TARGET = np.concatenate([NEIGHBOUR.reshape(-1), JUMP.reshape(-1), np.full(N_CELLS, OFF)])
+OVER = np.concatenate([np.full(N_CELLS * 6, OFF), NEIGHBOUR.reshape(-1), np.full(N_CELLS, OFF)])
+
+
+def initial_boards(n):
+    boards = np.zeros((n, N_CELLS), dtype=np.int8)
+    for k, c in enumerate(COLOURS):
+        boards[:, [config.CELL_ID[s] for s in config.START[c]]] = k + 1
+    return boards
+
+
+def from_dict(current_board):
+    """ one board dict as a row of the batch """
+    return np.array([config.P_MAPPING[current_board[c]] for c in config.CELLS], dtype=np.int8)
+
+
+def to_dict(row):
+    names = ["empty"] + COLOURS
+    return {c: names[row[i]] for i, c in enumerate(config.CELLS)}
+
+
+def legal_mask(boards, colours):
+    """
+    (N, N_ACTIONS) bool, the actions each board's player `colours` (values 1-3) can take
+    """
+    n = boards.shape[0]
+    padded = np.concatenate([boards, np.full((n, 1), -1, dtype=boards.dtype)], axis=1)
+
+    own = boards == colours[:, None]
+    near = padded[:, NEIGHBOUR]
+    land = padded[:, JUMP]
+
+    move = own[:, :, None] & (near == 0)
+    jump = own[:, :, None] & (near > 0) & (land == 0)
+    leave = own & GOAL[colours - 1]
+
+    mask = np.zeros((n, N_ACTIONS), dtype=bool)
+    mask[:, :JUMP_BASE] = move.reshape(n, -1)
+    mask[:, JUMP_BASE:EXIT_BASE] = jump.reshape(n, -1)
+    mask[:, EXIT_BASE:PASS_ACTION] = leave
+    mask[:, PASS_ACTION] = ~mask[:, :PASS_ACTION].any(axis=1)
+
+    return mask
+
+
+def apply(boards, colours, actions, exits=None):
+    """
+    play actions[i] for colours[i] on boards[i], in place.
+    exits (N, 3) gets the EXIT counted when given
+    """
+    rows = np.arange(boards.shape[0])
+
+    real = actions != PASS_ACTION
+    rows, colours, actions = rows[real], colours[real], actions[real]
+    colours = colours.astype(boards.dtype)
+
+    boards[rows, SOURCE[actions]] = 0
+
+    # MOVE and JUMP land on a cell, JUMP also takes the piece jumped over
+    landed = TARGET[actions] != OFF
+    boards[rows[landed], TARGET[actions[landed]]] = colours[landed]
+
+    jumped = OVER[actions] != OFF
+    boards[rows[jumped], OVER[actions[jumped]]] = colours[jumped]
+
+    if exits is not None:
+        left = actions >= EXIT_BASE
+        np.add.at(exits, (rows[left], colours[left] - 1), 1)
+
+    return boards
+
+
+def random_actions(mask, rng):
+    """ one legal action picked uniformly for every board (PASS keeps every row non-empty) """
+    rows, actions = np.nonzero(mask)
+    counts = np.bincount(rows, minlength=mask.shape[0])
+    starts = np.cumsum(counts) - counts
+
+    return actions[starts + (rng.random(mask.shape[0]) * counts).astype(np.intp)]
+
+
+# cell id at [q + 3, r + 3], direction at [dq + 1, dr + 1], -1 where there is none
+CELL_GRID = np.full((7, 7), -1, dtype=np.intp)
+for _i, _c in enumerate(config.CELLS):
+    CELL_GRID[_c[0] + 3, _c[1] + 3] = _i
+
+DIRECTION_GRID = np.full((3, 3), -1, dtype=np.intp)
+for _d, (_dq, _dr) in enumerate(DIRECTIONS):
+    DIRECTION_GRID[_dq + 1, _dr + 1] = _d
+
+
+def action_id(action):
+    """ id of a referee action tuple, e.g. ("JUMP", ((0, 0), (2, -2))) """
+    kind = action[0]
+    if kind in ("MOVE", "JUMP"):
+        (q1, r1), (q2, r2) = action[1]
+        k = 1 if kind == "MOVE" else 2
+        a = config.CELL_ID[(q1, r1)] * 6 + DIRECTIONS.index(((q2 - q1) // k, (r2 - r1) // k))
+        return a if kind == "MOVE" else JUMP_BASE + a
+    if kind == "EXIT":
+        return EXIT_BASE + config.CELL_ID[tuple(action[1])]
+    return PASS_ACTION
+
+
+def action_of(a):
+    """ referee action tuple of an id """
+    if a == PASS_ACTION:
+        return "PASS", None
+    if a >= EXIT_BASE:
+        return "EXIT", config.CELLS[a - EXIT_BASE]
+    kind = "MOVE" if a < JUMP_BASE else "JUMP"
+    cell = SOURCE[a]
+    return kind, (config.CELLS[cell], config.CELLS[TARGET[a]])
+
+
+def encode_actions(rows):
+    """
+    ids of the rows of a gamelog action column (kind, q1, r1, q2, r2),
+    -1 for turns without an action
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    kind = rows[:, 0]
+    res = np.full(len(rows), -1, dtype=np.intp)
+
+    cell = CELL_GRID[rows[:, 1] + 3, rows[:, 2] + 3]
+    step = np.where(kind == 2, 2, 1)
+    # only MOVE and JUMP rows have a direction, the others are kept on the grid
+    dq = np.clip((rows[:, 3] - rows[:, 1]) // step + 1, 0, 2)
+    dr = np.clip((rows[:, 4] - rows[:, 2]) // step + 1, 0, 2)
+    d = DIRECTION_GRID[dq, dr]
+
+    res[kind == 1] = (cell * 6 + d)[kind == 1]
+    res[kind == 2] = (JUMP_BASE + cell * 6 + d)[kind == 2]
+    res[kind == 3] = (EXIT_BASE + cell)[kind == 3]
+    res[kind == 4] = PASS_ACTION
+    return res
+
+
+class BatchGames:
+    """
+    N games played side by side, red moves first in all of them
+    """
+
+    def __init__(self, n, boards=None, seed=None):
+        self.boards = initial_boards(n) if boards is None else np.array(boards, dtype=np.int8)
+        self.exits = np.zeros((n, 3), dtype=np.int16)
+        self.colours = np.ones(n, dtype=np.int8)
+        self.turns = 0
+
+        # 0 still playing, 1-3 the winner, -1 draw by turn limit
+        self.result = np.zeros(n, dtype=np.int8)
+
+        self.rng = np.random.default_rng(seed)
+
+    def playing(self):
+        return np.flatnonzero(self.result == 0)
+
+    def step(self, actions=None):
+        """
+        one turn for every unfinished game, random actions if none are given
+        (actions are for the unfinished games only, in order)
+        """
+        live = self.playing()
+        boards = self.boards[live]
+        colours = self.colours[live]
+        exits = self.exits[live]
+
+        if actions is None:
+            actions = random_actions(legal_mask(boards, colours), self.rng)
+
+        apply(boards, colours, actions, exits)
+
+        self.boards[live] = boards
+        self.exits[live] = exits
+        self.colours[live] = colours % 3 + 1
+        self.turns += 1
+
+        won = exits.max(axis=1) >= 4
+        self.result[live[won]] = np.argmax(exits[won], axis=1) + 1
+        if self.turns >= MAX_TURNS:
+            self.result[self.result == 0] = -1
+
+        return live, actions
+
+    def playout(self):
+        """ random play until every game is over, returns the results """
+        while len(self.playing()):
+            self.step()
+        return self.result
+
+
+def _dict_playout(rng):
+    """ one random game on board dicts, with utils.find_next and get_next_curbo """
+    board = {c: "empty" for c in config.CELLS}
+    for c in COLOURS:
+        for s in config.START[c]:
+            board[s] = c
+    exits = {c: 0 for c in COLOURS}
+
+    for t in range(MAX_TURNS):
+        colour = COLOURS[t % 3]
+        ps = [p for p in config.CELLS if board[p] == colour]
+
+        actions = [("EXIT", p) for p in ps if p in config.GOALS[colour]]
+        for p in ps:
+            for m in utils.find_next(p, board):
+                actions.append(("MOVE" if m[2] == 1 else "JUMP", (m[0], m[1])))
+        if not actions:
+            actions = [("PASS", None)]
+
+        action = actions[rng.integers(len(actions))]
+        board = utils.get_next_curbo(board, action, colour)
+        if action[0] == "EXIT":
+            exits[colour] += 1
+            if exits[colour] == 4:
+                break
+
+    return t + 1
+
+
+def benchmark(n=1000, dict_games=5, seed=0):
+    """ random playouts per second, batched against board dicts """
+    rng = np.random.default_rng(seed)
+
+    start = time.time()
+    positions = 0
+    for g in range(dict_games):
+        positions += _dict_playout(rng)
+    dict_rate = positions / (time.time() - start)
+
+    games = BatchGames(n, seed=seed)
+    start = time.time()
+    positions = 0
+    while len(games.playing()):
+        positions += len(games.step()[0])
+    batch_rate = positions / (time.time() - start)
+
+    print("board dicts: %.0f positions/s" % dict_rate)
+    print("batch of %d: %.0f positions/s (%.0fx)" % (n, batch_rate, batch_rate / dict_rate))
+    return dict_rate, batch_rate
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="batched random playout throughput")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--dict-games", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark(args.games, args.dict_games, args.seed)
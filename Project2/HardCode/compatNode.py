@@ -1,12 +1,26 @@
 import HardCode.config as config
 import HardCode.utils as utils
+import HardCode.incremental as incremental
+import shared.cache as cache
 import copy
 
 class CompatNode:
 
-    def __init__(self, next_board, colour, last_colour_e, parent_n=None, action=("None", None), turn=0):
+    def __init__(self, next_board, colour, last_colour_e, parent_n=None, action=("None", None), turn=0, state=None, evals=None, evaluator=None):
         self.turn = turn
-        self.current_board = next_board
+
+        # cache.EvalCache shared by the whole tree, None to always evaluate
+        self.evals = evals
+
+        # evaluation.Evaluation of the player, None for the default weights
+        self.evaluator = evaluator
+
+        # board with piece lists and heuristic sums, successors only update them
+        if state is None:
+            state = incremental.IncrementalBoard(next_board)
+        self.state = state
+
+        self.current_board = state.board
         self.parent_n = parent_n
         self.colour = colour
         self.cost = config.COST
@@ -23,29 +37,32 @@ class CompatNode:
             self.colour_e[colour] += 1
         self.action = action
 
-        self.colour_p = {
-            "red": [],
-            "green": [],
-            "blue": []
-        }
-        
-
-        for clr in self.colour_p.keys():
-            self.colour_p[clr] = [x for x in self.current_board.keys() if self.current_board[x] == clr]
+        # pieces of each colour (shared with the state, do not modify)
+        self.colour_p = state.pieces
 
         if parent_n != None:
-            self.cald = utils.cal_all(parent_n.current_board,
-                                      self.current_board,
-                                      self.colour,
-                                      self.colour_e,
-                                      self.colour_p,
-                                      self.action,
-                                      self.arrange,
-                                      self.action[0] == "EXIT")
+            # parent and successor positions decide the action as well
+            key = (parent_n.state.key, state.key, colour, cache.exits_key(self.colour_e))
+            self.cald = evals.get(key) if evals is not None else None
+
+            if self.cald is None:
+                self.cald = self.state.cal_all(parent_n.state,
+                                               self.colour,
+                                               self.colour_e,
+                                               self.action,
+                                               self.arrange,
+                                               self.action[0] == "EXIT",
+                                               evaluator)
+                if evals is not None:
+                    evals.put(key, self.cald)
         else:
             self.cald = []
     
     
+    def features(self):
+        """ evaluation features of this successor, see IncrementalBoard.features """
+        return self.state.features(self.parent_n.state, self.colour, self.colour_e, self.action, self.evaluator)
+
     def expand(self, colour =""):
 
         if colour == "":
@@ -62,9 +79,9 @@ class CompatNode:
         for a in ps:
             if a in self.goal[colour]:
                 action = ("EXIT", a)
-                next_bor =utils.get_next_curbo(self.current_board, action, colour)
-                
-                next_node = CompatNode(next_bor, colour, self.colour_e, self, action, nxt_turn)
+                next_state = self.state.apply(action, colour)
+
+                next_node = CompatNode(next_state.board, colour, self.colour_e, self, action, nxt_turn, next_state, self.evals, self.evaluator)
                 all_state_players.append(next_node)
 
 
@@ -82,18 +99,18 @@ class CompatNode:
                     elif ms[2] == 2:
                         m_action = ("JUMP", (ms[0], ms[1]))
                     
-                    next_bor =utils.get_next_curbo(self.current_board, m_action, colour)
+                    next_state = self.state.apply(m_action, colour)
 
-                    next_node = CompatNode(next_bor, colour, self.colour_e, self, m_action, nxt_turn)
+                    next_node = CompatNode(next_state.board, colour, self.colour_e, self, m_action, nxt_turn, next_state, self.evals, self.evaluator)
 
                     all_state_players.append(next_node)
 
                     # delta heuristic
             else:
                 action = ("PASS", None)
-                next_bor =utils.get_next_curbo(self.current_board, action, colour)
-                
-                next_node = CompatNode(next_bor, colour, self.colour_e, self, action, nxt_turn)
+                next_state = self.state.apply(action, colour)
+
+                next_node = CompatNode(next_state.board, colour, self.colour_e, self, action, nxt_turn, next_state, self.evals, self.evaluator)
                 all_state_players.append(next_node)
         
         return all_state_players
@@ -0,0 +1,198 @@
+import HardCode.config as config
+import HardCode.utils as utils
+import shared.bitboard as bitboard
+import shared.cache as cache
+import bisect
+
+COLOURS = ["red", "green", "blue"]
+
+
+class IncrementalBoard:
+    """
+    a board together with the piece list, the heuristic sum and the cost
+    histogram (see utils.cost_hist) of each colour.
+
+    successors are made from the 2-3 cells an action touches, so everything
+    utils.cal_all needs can be taken from the difference to the parent
+    board instead of scanning all the 37 cells of both boards again.
+    """
+
+    def __init__(self, current_board, pieces=None, sums=None, masks=None, hists=None, key=None):
+        self.board = current_board
+
+        # pieces of each colour, kept in the same order as config.CELLS
+        if pieces is None:
+            pieces = {c: [x for x in config.CELLS if current_board[x] == c] for c in COLOURS}
+
+        # sum of the cost of all pieces for each colour
+        if sums is None:
+            sums = {c: sum([config.COST_TABLE[c][config.CELL_ID[p]] for p in pieces[c]]) for c in COLOURS}
+
+        # number of pieces at each cost for each colour
+        if hists is None:
+            hists = {c: utils.cost_hist(pieces[c], c) for c in COLOURS}
+
+        # occupancy of each colour as a bitboard
+        if masks is None:
+            masks = bitboard.masks(current_board)
+
+        self.pieces = pieces
+        self.sums = sums
+        self.masks = masks
+        self.hists = hists
+
+        # zobrist hash of the board, see cache.board_hash
+        self.key = cache.board_hash(current_board) if key is None else key
+
+        # utils.heuristic for each (colour, player_exit), only calculated when needed
+        self._heuristic = {}
+
+    def apply(self, action, colour):
+        """
+        successor after `colour` takes `action`, same board as utils.get_next_curbo
+        """
+
+        board = dict(self.board)
+        pieces = dict(self.pieces)
+        sums = dict(self.sums)
+        masks = dict(self.masks)
+        hists = dict(self.hists)
+        key = self.key
+        zobrist = cache.ZOBRIST
+        cost = config.COST_TABLE
+        cell_id = config.CELL_ID
+        bit = bitboard.BIT
+
+        if action[0] in ("MOVE", "JUMP"):
+            fr, to = action[1]
+            own = pieces[colour] = list(pieces[colour])
+            own_h = hists[colour] = list(hists[colour])
+            c_fr = cost[colour][cell_id[fr]]
+            c_to = cost[colour][cell_id[to]]
+
+            board[fr] = "empty"
+            board[to] = colour
+            own.remove(fr)
+            bisect.insort(own, to)
+            sums[colour] += c_to - c_fr
+            masks[colour] ^= bit[fr] | bit[to]
+            own_h[c_fr] -= 1
+            own_h[c_to] += 1
+            key ^= zobrist[(fr, colour)] ^ zobrist[(to, colour)]
+
+            if action[0] in ("JUMP", ):
+                sk = ((fr[0] + to[0]) // 2, (fr[1] + to[1]) // 2)
+                victim = board[sk]
+
+                # the piece jumped over is taken
+                if victim != "empty" and victim != colour:
+                    c_victim = cost[victim][cell_id[sk]]
+                    c_own = cost[colour][cell_id[sk]]
+
+                    board[sk] = colour
+                    pieces[victim] = [p for p in pieces[victim] if p != sk]
+                    sums[victim] -= c_victim
+                    masks[victim] ^= bit[sk]
+                    hists[victim] = list(hists[victim])
+                    hists[victim][c_victim] -= 1
+
+                    bisect.insort(own, sk)
+                    sums[colour] += c_own
+                    masks[colour] |= bit[sk]
+                    own_h[c_own] += 1
+                    key ^= zobrist[(sk, victim)] ^ zobrist[(sk, colour)]
+
+        elif action[0] in ("EXIT",):
+            c_fr = cost[colour][cell_id[action[1]]]
+
+            board[action[1]] = "empty"
+            pieces[colour] = [p for p in pieces[colour] if p != action[1]]
+            sums[colour] -= c_fr
+            masks[colour] ^= bit[action[1]]
+            hists[colour] = list(hists[colour])
+            hists[colour][c_fr] -= 1
+            key ^= zobrist[(action[1], colour)]
+
+        return IncrementalBoard(board, pieces, sums, masks, hists, key)
+
+    def heuristic(self, colour, player_exit):
+        """
+        same as utils.heuristic over the pieces of `colour` on this board
+        """
+
+        key = (colour, player_exit)
+
+        if key not in self._heuristic:
+            self._heuristic[key] = utils.heuristic_hist(self.hists[colour], len(self.pieces[colour]), player_exit)
+
+        return self._heuristic[key]
+
+    def danger(self, colour):
+        """
+        number of pieces of `colour` that could be taken by one JUMP of an
+        opponent, same as utils.cal_dpiei on this board
+        """
+
+        return bitboard.danger(self.masks, colour)
+
+    def cal_all(self, parent, colour, colour_e, action, arrange, exit_this=False, evaluator=None):
+        """
+        same result as utils.cal_all(parent.board, self.board, ...), where
+        this board is the successor of `parent`
+        """
+
+        rew = 0
+
+        d_heurii = self.sums[colour] - parent.sums[colour]
+
+        if exit_this:
+            rew += config.EXIT_RW
+
+        piece_difference = len(self.pieces[colour]) - len(parent.pieces[colour])
+        danger_piece = self.danger(colour)
+
+        log_uti = [d_heurii, piece_difference, danger_piece]
+        log_uti += utils.player_es(colour_e, False, arrange)
+        log_uti += [self.heuristic(c, colour_e[c]) for c in arrange]
+
+        reach, mobility = utils.reach_mobility(self.masks, colour, colour_e[colour], evaluator)
+
+        other_rheu = self.other_rheu(parent, colour, colour_e)
+
+        ev = utils.hard_code_eva_function(piece_difference, d_heurii, danger_piece, self.pieces[colour],
+                                          colour_e[colour], action, other_rheu, evaluator, reach, mobility)
+        rew += utils.check_heuristic_rew(colour_e, self.board, colour, d_heurii)
+
+        return rew, d_heurii, log_uti, ev
+
+    def other_rheu(self, parent, colour, colour_e):
+        """ change of the heuristic of the other colours from `parent` """
+        res = {}
+        for c in COLOURS:
+            if c == colour:
+                continue
+            # only changed if one of its pieces has been taken
+            if self.pieces[c] is parent.pieces[c]:
+                res[c] = 0
+            else:
+                res[c] = self.heuristic(c, colour_e[c]) - parent.heuristic(c, colour_e[c])
+        return res
+
+    def features(self, parent, colour, colour_e, action, evaluator=None):
+        """
+        evaluation.features of this successor of `parent`, the vector cal_all
+        scores to get ev. reach and mobility are always worked out here (once a
+        turn, for the log), so TDLeaf can learn their weights from 0
+        """
+        if evaluator is None:
+            evaluator = utils.DEFAULT_EVALUATION
+
+        return evaluator.features(len(self.pieces[colour]) - len(parent.pieces[colour]),
+                                  self.sums[colour] - parent.sums[colour],
+                                  self.danger(colour),
+                                  self.pieces[colour],
+                                  colour_e[colour],
+                                  action,
+                                  self.other_rheu(parent, colour, colour_e),
+                                  utils.cal_reach(self.masks, colour, colour_e[colour]),
+                                  utils.cal_mobility(self.masks, colour))
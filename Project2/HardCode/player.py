@@ -6,7 +6,7 @@ import copy
 
 class Player:
 
-    def __init__(self, colour):
+    def __init__(self, colour, weights=None):
         """
         This method is called once at the beginning of the game to initialise
         your player. You should use this opportunity to set up your own internal
@@ -16,6 +16,9 @@ class Player:
         The parameter colour will be a string representing the player your 
         program will play as (Red, Green or Blue). The value will be one of the 
         strings "red", "green", or "blue" correspondingly.
+
+        weights are the evaluation weights to play with (see evaluation.py),
+        config.EVAL_WEIGHTS by default.
         """
         # print(colour)
         self.colour = colour
@@ -35,7 +38,7 @@ class Player:
             "green": 0
         }
 
-        self.strategy = strategy.Strategy(self.goal, self.colour)
+        self.strategy = strategy.Strategy(self.goal, self.colour, weights)
 
         # TODO: Set up state representation.
 
@@ -3,6 +3,8 @@ import HardCode.config as config
 import HardCode.logger as logger
 
 import HardCode.compatNode as cnode
+import shared.cache as cache
+import shared.evaluation as evaluation
 import copy
 import queue
 
@@ -12,7 +14,7 @@ import queue
 #  more or equal to 4 then prevent to be eaten
 class Strategy:
 
-    def __init__(self, goals, colour):
+    def __init__(self, goals, colour, weights=None):
         self.cost = config.COST
 
         self.colour = colour
@@ -31,11 +33,17 @@ class Strategy:
 
         self.logger = logger.Logger(self.colour)
 
+        # weights of the evaluation function, config.EVAL_WEIGHTS if not given
+        self.evaluator = evaluation.Evaluation(config.EVAL_WEIGHTS if weights is None else weights)
+
+        # evaluations kept between turns
+        self.evals = cache.EvalCache(config.CACHE_SIZE, config.CACHE_ENABLED)
+
 
     def get_possible_moves(self, current_board, colour, colour_p, goal, colour_e):
         self.turn += 1
 
-        node = cnode.CompatNode(current_board, colour, colour_e, turn=self.turn)
+        node = cnode.CompatNode(current_board, colour, colour_e, turn=self.turn, evals=self.evals, evaluator=self.evaluator)
 
         succesrs = node.expand()
         for c in ["red", "green", "blue"]:
@@ -61,7 +69,9 @@ class Strategy:
         ev = max_e.cald[3]
         rew = max_e.cald[0]
 
-        self.logger.add_log(max_e.current_board, action=max_e.action, rew=rew, d_heur=re, utility=utility, ev=ev, turns=max_e.turn)
+        # the features of the chosen leaf are what TDLeaf learns the weights from
+        self.logger.add_log(max_e.current_board, action=max_e.action, rew=rew, d_heur=re, utility=utility, ev=ev,
+                            turns=max_e.turn, features=max_e.features())
         
         return max_e.action
 
@@ -0,0 +1,82 @@
+import HardCode.config as config
+import HardCode.batch as batch
+import numpy as np
+
+'''
+    the board turned by 120 degrees.
+
+    one step (q, r) -> (-q - r, q) takes red's start and goal cells onto
+    green's, green's onto blue's and blue's onto red's, and keeps the turn
+    order red, green, blue (config.MAIN). so a position turned k steps with
+    every colour moved k on in COLOURS is the same position for the player
+    now in that colour, and anything measured from a player's own point of
+    view (get_board, the utilities) stays the same.
+
+    boards are rows of cell values in config.CELLS order, any code for the
+    colours (the codes dict, config.P_MAPPING or gamelog.CODE), actions are
+    batch.py action ids.
+'''
+
+COLOURS = ["red", "green", "blue"]
+
+N_CELLS = len(config.CELLS)
+
+
+def rotate_cell(cell, k=1):
+    q, r = cell
+    for _ in range(k % 3):
+        q, r = -q - r, q
+    return q, r
+
+
+def rotate_colour(colour, k=1):
+    return COLOURS[(COLOURS.index(colour) + k) % 3]
+
+
+def to_red(colour):
+    """ steps that turn `colour` into red, the mover's point of view """
+    return -COLOURS.index(colour) % 3
+
+
+# CELL_PERM[k, i] is the index of cell i turned k steps
+CELL_PERM = np.array([[config.CELL_ID[rotate_cell(c, k)] for c in config.CELLS] for k in range(3)], dtype=np.intp)
+
+# same for the directions of batch.DIRECTIONS
+DIRECTION_PERM = np.array([[batch.DIRECTIONS.index(rotate_cell(d, k)) for d in batch.DIRECTIONS]
+                           for k in range(3)], dtype=np.intp)
+
+# ACTION_PERM[k, a] is action id a turned k steps
+ACTION_PERM = np.zeros((3, batch.N_ACTIONS), dtype=np.intp)
+for _k in range(3):
+    _move = (CELL_PERM[_k][:, None] * 6 + DIRECTION_PERM[_k][None, :]).reshape(-1)
+    ACTION_PERM[_k, :batch.JUMP_BASE] = _move
+    ACTION_PERM[_k, batch.JUMP_BASE:batch.EXIT_BASE] = batch.JUMP_BASE + _move
+    ACTION_PERM[_k, batch.EXIT_BASE:batch.PASS_ACTION] = batch.EXIT_BASE + CELL_PERM[_k]
+    ACTION_PERM[_k, batch.PASS_ACTION] = batch.PASS_ACTION
+
+
+def value_table(codes, k):
+    """ lookup of the new value of every cell value, colours moved k on """
+    table = np.arange(max(codes.values()) + 1, dtype=np.uint8)
+    for c in COLOURS:
+        table[codes[c]] = codes[rotate_colour(c, k)]
+    return table
+
+
+def rotate_boards(boards, k, codes=config.P_MAPPING):
+    """ boards (n, 37) turned k steps, k one for all or one per board """
+    boards = np.asarray(boards)
+    res = np.empty_like(boards)
+    k = np.broadcast_to(np.asarray(k) % 3, boards.shape[:1])
+    for step in range(3):
+        rows = k == step
+        if rows.any():
+            res[np.ix_(rows, CELL_PERM[step])] = value_table(codes, step).astype(boards.dtype)[boards[rows]]
+    return res
+
+
+def rotate_actions(actions, k):
+    """ action ids turned k steps, -1 (no action) stays -1 """
+    actions = np.asarray(actions)
+    k = np.asarray(k) % 3
+    return np.where(actions < 0, actions, ACTION_PERM[k, np.maximum(actions, 0)])
@@ -0,0 +1,194 @@
+import HardCode.config as config
+import shared.evaluation as evaluation
+import referee.headless as headless
+from multiprocessing import Pool
+import argparse
+import random
+import json
+import time
+import os
+
+'''
+    (mu + lambda) evolution of the evaluation weights.
+
+    every generation each of the mu parents gets lambda / mu children, made by
+    adding gaussian noise to its weights. a weight vector is scored by playing
+    HardCode with it against two HardCode players with config.EVAL_WEIGHTS, in
+    every seat and from a few random openings. the best mu of parents and
+    children are kept.
+
+    games run in a pool of worker processes, and the population is written to
+    the checkpoint after every generation so a stopped run can be resumed.
+'''
+
+COLOURS = ["red", "green", "blue"]
+
+# points for one game, plus EXIT_POINT for each exited piece to break ties
+WIN_POINT = 1.0
+DRAW_POINT = 0.25
+EXIT_POINT = 0.05
+
+
+def play_one(task):
+    """ one game of `weights` in seat `seat` against the default weights """
+    weights, seat, opening, seed = task
+
+    specs = ["HardCode"] * 3
+    specs[seat] = ("HardCode", {"weights": weights})
+
+    res = headless.play_game(specs, opening=opening, seed=seed)
+
+    colour = COLOURS[seat]
+    points = EXIT_POINT * res["score"][colour]
+    if res["winner"] == colour:
+        points += WIN_POINT
+    elif res["winner"] is None:
+        points += DRAW_POINT
+
+    return points
+
+
+def mutate(weights, sigma, rng):
+    """ gaussian noise relative to the size of each weight """
+    return [w + rng.gauss(0, sigma * (abs(w) + 1)) for w in weights]
+
+
+class Tuner:
+
+    def __init__(self, mu=4, lam=12, sigma=0.2, openings=2, opening_moves=6, workers=None,
+                 checkpoint="tuner.json", seed=0):
+        self.mu = mu
+        self.lam = lam
+        self.sigma = sigma
+        self.openings = openings
+        self.opening_moves = opening_moves
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.seed = seed
+
+        self.generation = 0
+
+        # [{"weights": [...], "fitness": float}, ...] best first
+        self.population = []
+
+    def tasks(self, weights):
+        """ games played to score one weight vector, the same for every vector in a generation """
+        res = []
+        for o in range(self.openings):
+            for seat in range(3):
+                res.append((weights, seat, self.opening_moves if o else 0, self.seed * 1000 + o))
+        return res
+
+    def evaluate(self, pool, candidates):
+        tasks = []
+        for w in candidates:
+            tasks += self.tasks(w)
+
+        points = pool.map(play_one, tasks)
+        n = len(tasks) // len(candidates)
+
+        return [sum(points[i * n:(i + 1) * n]) / n for i in range(len(candidates))]
+
+    def start(self, pool):
+        rng = random.Random(self.seed)
+        base = list(config.EVAL_WEIGHTS)
+
+        candidates = [base] + [mutate(base, self.sigma, rng) for i in range(self.mu - 1)]
+        fitness = self.evaluate(pool, candidates)
+
+        self.population = self.select(candidates, fitness)
+
+    def step(self, pool):
+        rng = random.Random("%d-%d" % (self.seed, self.generation))
+
+        children = []
+        for i in range(self.lam):
+            parent = self.population[i % len(self.population)]["weights"]
+            children.append(mutate(parent, self.sigma, rng))
+
+        fitness = self.evaluate(pool, children)
+
+        parents = [p["weights"] for p in self.population]
+        self.population = self.select(parents + children, [p["fitness"] for p in self.population] + fitness)
+        self.generation += 1
+
+    def select(self, candidates, fitness):
+        ranked = sorted(zip(fitness, range(len(candidates))), key=lambda x: -x[0])
+        return [{"weights": candidates[i], "fitness": f} for f, i in ranked[:self.mu]]
+
+    def save(self):
+        data = {
+            "generation": self.generation,
+            "mu": self.mu,
+            "lam": self.lam,
+            "sigma": self.sigma,
+            "openings": self.openings,
+            "opening_moves": self.opening_moves,
+            "seed": self.seed,
+            "population": self.population
+        }
+
+        # write then rename, so an interrupted save keeps the last checkpoint
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.checkpoint)
+
+    def load(self):
+        with open(self.checkpoint) as f:
+            data = json.load(f)
+
+        for key in ("generation", "mu", "lam", "sigma", "openings", "opening_moves", "seed", "population"):
+            setattr(self, key, data[key])
+
+        # checkpoints from before the reach and mobility features
+        for p in self.population:
+            p["weights"] = evaluation.pad(p["weights"])
+
+    def run(self, generations, resume=False):
+        if resume and os.path.exists(self.checkpoint):
+            self.load()
+            print("resumed at generation", self.generation)
+
+        with Pool(self.workers) as pool:
+            if not self.population:
+                self.start(pool)
+                self.save()
+
+            while self.generation < generations:
+                start = time.time()
+                self.step(pool)
+                self.save()
+
+                best = self.population[0]
+                print("generation %d best %.3f (%.1fs)" % (self.generation, best["fitness"], time.time() - start))
+
+        return self.population[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="evolve the HardCode evaluation weights")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--mu", type=int, default=4)
+    parser.add_argument("--lam", type=int, default=12)
+    parser.add_argument("--sigma", type=float, default=0.2)
+    parser.add_argument("--openings", type=int, default=2, help="games from the start plus random openings per seat")
+    parser.add_argument("--opening-moves", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--checkpoint", default="tuner.json")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="save the best weights for evaluation.Evaluation(filename=...)")
+    args = parser.parse_args()
+
+    tuner = Tuner(args.mu, args.lam, args.sigma, args.openings, args.opening_moves, args.workers,
+                  args.checkpoint, args.seed)
+    best = tuner.run(args.generations, args.resume)
+
+    print("best weights", best["weights"])
+    if args.out:
+        evaluation.Evaluation(best["weights"]).save(args.out)
+
+
+if __name__ == "__main__":
+    main()
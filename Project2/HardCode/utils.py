@@ -1,4 +1,6 @@
 import HardCode.config as config
+import shared.bitboard as bitboard
+import shared.evaluation as evaluation
 import copy
 
 
@@ -111,7 +113,7 @@ def find_next(piece: tuple, current_board: dict) -> list:
     return next_coords
 
 
-def cal_all(current_board, next_bor, colour, colour_e, colour_p, action, arrange, exit_this=False):
+def cal_all(current_board, next_bor, colour, colour_e, colour_p, action, arrange, exit_this=False, evaluator=None):
 
         rew = 0
 
@@ -128,7 +130,10 @@ def cal_all(current_board, next_bor, colour, colour_e, colour_p, action, arrange
 
         other_rheu = cal_otherrheu(current_board, next_bor, colour, colour_e)
 
-        ev = hard_code_eva_function(piece_difference, d_heurii, danger_piece, colour_p[colour], colour_e[colour], action, other_rheu)
+        reach, mobility = reach_mobility(bitboard.masks(next_bor), colour, colour_e[colour], evaluator)
+
+        ev = hard_code_eva_function(piece_difference, d_heurii, danger_piece, colour_p[colour], colour_e[colour], action, other_rheu, evaluator,
+                                    reach, mobility)
         rew += check_heuristic_rew(colour_e, next_bor, colour, d_heurii)
 
         return rew, d_heurii, log_uti, ev
@@ -152,20 +157,45 @@ def get_utility(current_board, suc_bo, colour, re, colour_ea, arrange):
 
 
 def heuristic(players, colour, player_exit):
-    h = 0
+    return heuristic_hist(cost_hist(players, colour), len(players), player_exit)
+
 
-    tmp_h = []
+def cost_hist(players, colour):
+    """
+    number of pieces at each cost value, hist[v] = # of players whose cost is v
+    """
+    table = config.COST_TABLE[colour]
+    cell_id = config.CELL_ID
+
+    hist = [0] * config.COST_SIZE
     for p in players:
-        tmp_h.append(config.COST[colour][p])
+        hist[table[cell_id[p]]] += 1
+
+    return hist
 
-    tmp_h.sort()
+
+def heuristic_hist(hist, n, player_exit):
+    """
+    same as heuristic, from the cost histogram of the n pieces
+    """
     if player_exit == -1:
-        return sum(tmp_h)
-    if len(players) + player_exit >= 4:
-        h = sum(tmp_h[:4 - player_exit])
-    else:
-        h = sum(tmp_h)
-        h += (4 - (len(players) + player_exit)) * 10
+        return best_sum(hist, n)
+    if n + player_exit >= 4:
+        return best_sum(hist, 4 - player_exit)
+
+    return best_sum(hist, n) + (4 - (n + player_exit)) * 10
+
+
+def best_sum(hist, k):
+    """
+    sum of the k smallest costs in the histogram, no sort needed
+    """
+    h = 0
+    for v, n in enumerate(hist):
+        if n >= k:
+            return h + v * k
+        h += v * n
+        k -= n
 
     return h
 
@@ -224,25 +254,38 @@ def cal_pdiff(cur_state, next_state, colour):
 
 
 def cal_dpiei(cur_state, next_state, colour):
-    nxt_pl = [k for k in next_state.keys() if next_state[k] == colour]
-    nxt_ot = [k for k in next_state.keys() if next_state[k] != "empty" and next_state[k] != colour]
+    return bitboard.danger(bitboard.masks(next_state), colour)
 
-    tmp_current_board = {x: "empty" for x in config.CELLS}
-    for p in nxt_pl:
-        tmp_current_board[p] = "n"
-    for p in nxt_ot:
-        tmp_current_board[p] = "n"
 
-    dengr = set({})
-    
-    for p in nxt_ot:
-        p_nxt = find_next(p, tmp_current_board)
-        for d in p_nxt:
-            if d[2] == 2:
-                if d[3] in nxt_pl:
-                    dengr.add(d[3])
-    
-    return len(dengr)
+def cal_reach(board_masks, colour, player_exit):
+    """
+    like heuristic, but counting the turns to a goal on the current board
+    (jumps over the pieces there included) instead of on an empty board
+    """
+    own = board_masks[colour]
+    occupied = board_masks["red"] | board_masks["green"] | board_masks["blue"]
+
+    hist = bitboard.reach_hist(own, occupied, bitboard.GOAL_MASK[colour], config.REACH_LIMIT)
+
+    return heuristic_hist(hist, bitboard.popcount(own), player_exit)
+
+
+def cal_mobility(board_masks, colour):
+    occupied = board_masks["red"] | board_masks["green"] | board_masks["blue"]
+    return bitboard.mobility(board_masks[colour], occupied)
+
+
+def reach_mobility(board_masks, colour, player_exit, evaluator=None):
+    """
+    cal_reach and cal_mobility, each 0 without working it out when `evaluator`
+    (DEFAULT_EVALUATION if not given) has a 0 weight for it
+    """
+    if evaluator is None:
+        evaluator = DEFAULT_EVALUATION
+
+    reach = cal_reach(board_masks, colour, player_exit) if evaluator.uses_reach else 0
+    mobility = cal_mobility(board_masks, colour) if evaluator.uses_mobility else 0
+    return reach, mobility
 
 
 def cal_rheu( cur_state, next_state, colour, player_exit):
@@ -260,41 +303,26 @@ def cal_rheu( cur_state, next_state, colour, player_exit):
 '''
 
 
-def hard_code_eva_function(pieces_difference: int, reduced_heuristic: float, danger_pieces: int, players, player_exit, action, other_rheu) -> float:
+def hard_code_eva_function(pieces_difference: int, reduced_heuristic: float, danger_pieces: int, players, player_exit, action, other_rheu, evaluator=None,
+                           reach=0, mobility=0) -> float:
     """
     1. # possible safety movement (*1)
     2. reduced heuristic to dest (positive means increased, negative means decreased) *(-2)
     3. # of piece in danger (could be taken by opponent by one JUMP action) *(-5)
-    """
-    # print(pieces_difference, reduced_heuristic, danger_pieces)
-    t = len(players) + player_exit
-
-    if player_exit == 4:
-        return 99999
 
-    others = sum(other_rheu.values())
-
-    res = 0
+    weighted by `evaluator` (evaluation.Evaluation), config.EVAL_WEIGHTS if not given
+    """
+    if evaluator is None:
+        evaluator = DEFAULT_EVALUATION
 
-    if action[0] == "EXIT":
-        res += 10
+    return evaluator.score(pieces_difference, reduced_heuristic, danger_pieces, players, player_exit, action, other_rheu,
+                           reach, mobility)
 
-    res += others
 
-    if t < 4:
-        res += 30 * pieces_difference + (-1) * reduced_heuristic + danger_pieces * (-20) + others
-    elif t == 4:
-        res += 5 * pieces_difference + (-6) * reduced_heuristic + (danger_pieces - max(0, pieces_difference)) * (-20) + others
-    else:
-        res += 5 * pieces_difference + (-6) * reduced_heuristic + (danger_pieces - max(0, pieces_difference)) * (-5) + 1.5 * others
+DEFAULT_EVALUATION = evaluation.Evaluation(config.EVAL_WEIGHTS)
 
-    return res
 
 def check_heuristic_rew(colour_exit, suc_bo, colour, d_heur):
-    n_r = [k for k in suc_bo.keys() if suc_bo[k] != "empty" and suc_bo[k] == colour]
-    exited = colour_exit[colour]
-
-    count = exited + len(n_r)
 
     if d_heur > 0:
         return config.D_HEURISTIC
@@ -2,20 +2,16 @@ import Intelligent.utils as utils
 import random
 import math
 
-import queue
+import shared.distance as distance
 
 
 class Strategy:
 
     def __init__(self, goals):
-        self.cost = {}
-
         self.goals = goals
 
-        tmp_current_board = {x: "empty" for x in utils.CELLS}
-
-        for g in self.goals:
-            self.cost_from_goal(g, tmp_current_board)
+        # cost to our goals on the empty board
+        self.cost = distance.as_dict(distance.cost_table(self.goals))
         #utils.print_board(self.cost)
 
         self.log = []
@@ -118,57 +114,3 @@ class Strategy:
         3. # of piece in danger (could be taken by opponent by one JUMP action) *(-5)
         """
         return (3) *pieces_difference + (-5)*reduced_heuristic + danger_pieces * (-10)
-
-    def cost_from_goal(self, goal: tuple, tmp_current_board: dict) -> None:
-        """
-        Receive a goal coordinate and block list then calculate a pre
-        """
-
-        q = queue.Queue()
-
-        # (cost_from_goal, ((MOVE_counter, JUMP_counter), coordinates))
-        q.put((0, ((0, 0), goal)))
-
-        cost = {goal: 0}
-
-        self.cost[goal] = 1
-
-        while not q.empty():
-
-            current = q.get()
-
-            successors = utils.find_next(current[1][1], tmp_current_board)
-            child_cost = current[0] + 1
-
-            for s in successors:
-                if s[1] not in cost:
-                    # since we are using BFS to findNext the coordinates
-                    # better solution will be always expanded first
-
-                    # s[1] indicates if the next move s is achieved by move (1) or jump (2)
-                    # used in calculating heuristic g
-                    # which separately consider jump and moves since jump does not need to /2
-                    # to reach a admissible heuristic
-                    # toSuc = (MOVE_counter, JUMP_counter) <- counting both moves and jumps
-                    if s[2] == 1:
-                        s_counter = (current[1][0][0] + 1, current[1][0][1])
-                    elif s[2] == 2:
-                        s_counter = (current[1][0][0], current[1][0][1] + 1)
-
-                    q.put((child_cost, (s_counter, s[1])))
-                    cost[s[1]] = child_cost
-
-                    # if the cost less then update the closest cost
-                    h = s_counter[0] + 1
-
-                    '''if s_counter[0] % 2 == 0:
-                        h = h + (s_counter[0] / 2 + s_counter[1] + 1)
-                    else:
-                        h = h + ((s_counter[0] - 1) / 2 + s_counter[1] + 2)'''
-
-                    if s[1] not in self.cost:
-                        self.cost[s[1]] = h
-                    elif self.cost[s[1]] > h:
-                        self.cost[s[1]] = h
-
-        return
@@ -0,0 +1,100 @@
+import VanGame.keras_model as ker_m
+import VanGame.train as train
+import shared.gamelog as gamelog
+import referee.headless as headless
+import numpy as np
+import argparse
+import time
+
+'''
+    accuracy vs speed of the keras_model.dnn precisions.
+
+    the positions are feature rows of logged games ([turn] + utility + [ev],
+    same as strategy.get_board), read from the game logs in a folder or
+    taken from a few fresh headless games of VanGame. the float64 model is
+    the reference, every precision is timed on batches of those rows.
+
+        python -m VanGame.benchmark --logs ./rec
+        python -m VanGame.benchmark --games 4 --batch 100000
+'''
+
+
+def load_logs(folder):
+    """ rows of the VanGame games logged in `folder` """
+    rows = [train.inputs(g) for path in train.log_files([folder]) for g in train.read_games(path, "VanGame")]
+    return np.concatenate(rows) if rows else np.zeros((0, 11))
+
+
+def play_logs(games, seed=0):
+    """ rows logged by the three VanGame players of `games` headless games """
+    rows = []
+    for g in range(games):
+        players = headless.make_players(["VanGame"] * 3)
+        headless.play(players, opening=3, seed=seed + g)
+        for p in players:
+            rows.append(train.inputs(gamelog.from_log(p.strategy.logger.log)))
+    return np.concatenate(rows)
+
+
+def weight_bytes(model):
+    return sum(v.nbytes for v in model.params.values() if isinstance(v, np.ndarray))
+
+
+def run(rows, batch=100000, repeat=5, filename='trained_model'):
+    rows = np.asarray(rows, dtype=np.float64)
+    reference = ker_m.dnn(filename, "float64").predict_batch(rows)
+
+    # the timed batch, the logged rows over and over
+    big = np.resize(rows, (batch, rows.shape[1]))
+
+    res = {}
+    for precision in ker_m.PRECISIONS:
+        model = ker_m.dnn(filename, precision)
+        err = np.abs(model.predict_batch(rows) - reference)
+
+        x = big.astype(model.dtype)
+        model.predict_batch(x)
+        start = time.perf_counter()
+        for i in range(repeat):
+            model.predict_batch(x)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        res[precision] = {
+            "max_error": float(err.max()),
+            "mean_error": float(err.mean()),
+            # relative to the spread of the reference values, what softmax in utils.chose sees
+            "relative_error": float(err.max() / (np.ptp(reference) or 1.0)),
+            "positions_per_second": batch / elapsed,
+            "weight_bytes": weight_bytes(model)
+        }
+
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="accuracy and speed of the quantised VanGame network")
+    parser.add_argument("--logs", default=None, help="folder of logger files, else play --games games")
+    parser.add_argument("--games", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default="trained_model")
+    args = parser.parse_args()
+
+    if args.logs:
+        rows = load_logs(args.logs)
+    else:
+        rows = play_logs(args.games, args.seed)
+    print("%d positions" % len(rows))
+
+    res = run(rows, args.batch, args.repeat, args.model)
+
+    print("%-8s %12s %12s %12s %14s %8s" % ("", "max err", "mean err", "rel err", "positions/s", "bytes"))
+    for precision, r in res.items():
+        print("%-8s %12.3g %12.3g %12.3g %14.0f %8d" % (precision, r["max_error"], r["mean_error"],
+                                                      r["relative_error"], r["positions_per_second"],
+                                                      r["weight_bytes"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -64,4 +64,30 @@ MAIN = {
     "red": RED_MAIN,
     "green": GREEN_MAIN,
     "blue": BLUE_MAIN
-}
\ No newline at end of file
+}
+# weights of shared.evaluation.Evaluation used for the ev feature
+EVAL_WEIGHTS = [
+    0, 0,
+    20, -2, -10, 0, 0,
+    5, -8, -20, 0, 0,
+    5, -8, -20, 0, 0,
+    0, 0
+]
+
+# cal_all of successors kept between turns, max number of positions and the switch to turn it off
+CACHE_SIZE = 200000
+CACHE_ENABLED = True
+
+# precision of the network weights, see keras_model.PRECISIONS and benchmark.py
+MODEL_PRECISION = "float32"
+
+# discount of the rewards when training on game logs (train.py)
+DISCOUNT_RATE = 0.8
+
+# value model of strategy.py, "dnn" (keras_model) or "linear" (linear_model, a
+# single linear layer model only)
+VALUE_MODEL = "dnn"
+
+# model file (next to keras_model.py) of the linear model, what linear_model.py
+# saves, trained_model until there is one
+LINEAR_MODEL = "linear_model"
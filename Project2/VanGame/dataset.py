@@ -0,0 +1,185 @@
+import VanGame.config as config
+import VanGame.train as train
+import shared.gamelog as gamelog
+import HardCode.symmetry as symmetry
+import HardCode.batch as batch
+import numpy as np
+import argparse
+import json
+import os
+
+'''
+    training set from game logs, every position also turned into the other
+    two colours' points of view (HardCode.symmetry), repeated positions kept
+    once, split into train and validation shards.
+
+    a position is a logged board (after the player's action) and the colour
+    of the player, its target the discounted return (train.game_data). the
+    same board and colour seen again (openings, other games) is one example
+    with the mean of their targets, and `count` of them.
+
+    turning moves every colour on in the turn order, so the dnn inputs
+    ([turn] + utility + [ev], from the player's point of view) are the same
+    for the three turns, the board, colour and action are not.
+
+    a position goes to validation by the smallest hash of its three turns, so
+    all of them are on the same side, wherever and by whichever colour the
+    position was logged, and the split stays the same when the dataset is
+    built again with more games.
+
+    out/
+        train-00000.npz       board (n, 37) uint8 gamelog.CODE, colour uint8
+        validation-00000.npz  (COLOURS index), action int16 (batch.py id, -1
+        meta.json             none), inputs float32 (n, 11), target float32,
+                              count uint32, key uint64
+
+        python -m VanGame.dataset rec --out data
+'''
+
+# examples per shard
+SHARD_SIZE = 1000000
+
+# the hash, 64 bit FNV-1a over the bytes of the board and the colour
+FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def position_keys(boards, colours):
+    """ 64 bit hash of every (board, colour) """
+    rows = np.column_stack([boards, colours]).astype(np.uint64)
+    h = np.full(len(rows), FNV_OFFSET, dtype=np.uint64)
+    for j in range(rows.shape[1]):
+        h = (h ^ rows[:, j]) * FNV_PRIME
+    return h
+
+
+def positions(files, package="VanGame", discount_rate=config.DISCOUNT_RATE):
+    """ board, colour, action, inputs and target of every logged turn of `package` """
+    cols = {"board": [], "colour": [], "action": [], "inputs": [], "target": []}
+    for path in files:
+        for game in train.read_games(path, package):
+            x, y = train.game_data(game, discount_rate)
+            cols["board"].append(np.asarray(game["board"], dtype=np.uint8))
+            cols["colour"].append(np.full(len(x), gamelog.COLOUR_ID[game["colour"]], dtype=np.uint8))
+            cols["action"].append(batch.encode_actions(game["action"]).astype(np.int16))
+            cols["inputs"].append(x.astype(np.float32))
+            cols["target"].append(y.astype(np.float32))
+
+    if not cols["board"]:
+        return None
+    return {k: np.concatenate(v) for k, v in cols.items()}
+
+
+def augment(data):
+    """ the positions and their two turns, in that order, with `source` the row they came from """
+    n = len(data["colour"])
+    k = np.repeat(np.arange(3), n)
+
+    res = {
+        "board": symmetry.rotate_boards(np.tile(data["board"], (3, 1)), k, gamelog.CODE),
+        "colour": ((np.tile(data["colour"], 3) + k) % 3).astype(np.uint8),
+        "action": symmetry.rotate_actions(np.tile(data["action"], 3), k).astype(np.int16),
+        "inputs": np.tile(data["inputs"], (3, 1)),
+        "target": np.tile(data["target"], 3),
+        "source": np.tile(np.arange(n), 3)
+    }
+    res["key"] = position_keys(res["board"], res["colour"])
+    return res
+
+
+def dedupe(data):
+    """ one example per key, the first one with the mean target of all of them """
+    keys, first, inverse, count = np.unique(data["key"], return_index=True, return_inverse=True,
+                                            return_counts=True)
+    res = {k: v[first] for k, v in data.items()}
+    res["target"] = (np.bincount(inverse, weights=data["target"]) / count).astype(np.float32)
+    res["count"] = count.astype(np.uint32)
+    return res
+
+
+def is_validation(key, validation):
+    """
+    positions in the `validation` share, by the top bits of the key mixed
+    again (the keys it gets are the smallest of three, so not uniform)
+    """
+    h = key ^ (key >> np.uint64(31))
+    h = h * np.uint64(0xbf58476d1ce4e5b9)
+    h = h ^ (h >> np.uint64(29))
+    return (h >> np.uint64(40)) < np.uint64(int(validation * (1 << 24)))
+
+
+def write_shards(folder, name, data, shard_size=SHARD_SIZE, rng=None):
+    """ `data` shuffled into name-00000.npz, name-00001.npz, ... returns the file names """
+    n = len(data["key"])
+    order = rng.permutation(n) if rng is not None else np.arange(n)
+
+    names = []
+    for s, start in enumerate(range(0, n, shard_size)):
+        idx = order[start:start + shard_size]
+        fn = "%s-%05d.npz" % (name, s)
+        np.savez(os.path.join(folder, fn), **{k: v[idx] for k, v in data.items()})
+        names.append(fn)
+    return names
+
+
+def build(files, out, package="VanGame", discount_rate=config.DISCOUNT_RATE, validation=0.1,
+          shard_size=SHARD_SIZE, seed=0):
+    data = positions(files, package, discount_rate)
+    if data is None:
+        raise ValueError("no %s games in the logs" % package)
+
+    turned = augment(data)
+
+    # split by the smallest key of the three turns of each logged position
+    n = len(data["colour"])
+    val = is_validation(turned["key"].reshape(3, n).min(axis=0), validation)[turned["source"]]
+
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    meta = {"positions": n, "turned": 3 * n, "discount_rate": discount_rate, "validation_share": validation,
+            "package": package}
+    for name, rows in (("train", ~val), ("validation", val)):
+        part = {k: v[rows] for k, v in turned.items() if k != "source"}
+        part = dedupe(part)
+        meta[name] = {"examples": len(part["key"]), "files": write_shards(out, name, part, shard_size, rng)}
+
+    with open(os.path.join(out, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+
+    return meta
+
+
+def load(folder, split="train"):
+    """ the shards of `split` as one dict of arrays """
+    with open(os.path.join(folder, "meta.json")) as f:
+        files = json.load(f)[split]["files"]
+
+    parts = []
+    for fn in files:
+        with np.load(os.path.join(folder, fn)) as z:
+            parts.append({k: z[k] for k in z.files})
+    if not parts:
+        return {}
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="deduplicated training set of the turned positions of game logs")
+    parser.add_argument("folders", nargs="*", default=["rec"], help="folders of game logs")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--package", default="VanGame")
+    parser.add_argument("--discount", type=float, default=config.DISCOUNT_RATE)
+    parser.add_argument("--validation", type=float, default=0.1, help="share of positions to validate on")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    meta = build(train.log_files(args.folders), args.out, args.package, args.discount, args.validation,
+                 args.shard_size, args.seed)
+    print("%d positions, %d turned, %d train and %d validation examples" % (
+        meta["positions"], meta["turned"], meta["train"]["examples"], meta["validation"]["examples"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import VanGame.train as train
+import shared.gamelog as gamelog
+import referee.headless as headless
+from multiprocessing import Pool
+import argparse
+import random
+import json
+import time
+import os
+
+'''
+    self-play data farm.
+
+    plays games headless in a pool of worker processes and appends the log of
+    every player to a sharded dataset of binary game logs (shared.gamelog),
+    shard-00000.glog, shard-00001.glog, ... with the colour, package, result
+    and game number of each. train.py and tdleaf.py read the shards directly.
+    every game gets its own seed (from --seed and its number, see
+    Farm.tasks) for its opening and the players' own draws, and starts with
+    a random number (up to --opening) of random actions so the games do not
+    all repeat. the same seed and number play the same game again.
+
+    games are numbered on from the ones already in the folder, so running it
+    again adds new games rather than the same ones.
+
+        python -m VanGame.farm <folder> --games 1000
+        python -m VanGame.farm <folder> --games 200 --players VanGame HardCode VanGame
+'''
+
+COLOURS = ["red", "green", "blue"]
+
+# games per shard file
+SHARD_GAMES = 500
+
+# print the throughput every REPORT seconds
+REPORT = 30
+
+
+def play_one(task):
+    """ the game log columns of each player of one game, and the winner """
+    specs, game, seed, opening = task
+
+    players = headless.make_players(specs)
+    res = headless.play(players, opening, seed)
+
+    records = []
+    for colour, spec, p in zip(COLOURS, specs, players):
+        logger = getattr(getattr(p, "strategy", None), "logger", None)
+        if logger is None:
+            continue
+
+        if res["winner"] is None:
+            outcome = train.DRAW
+        else:
+            outcome = train.WIN if res["winner"] == colour else train.LOSS
+
+        package = spec if isinstance(spec, str) else spec[0]
+        records.append(gamelog.from_log(logger.log, colour, outcome, package, game))
+
+    return records, res["winner"]
+
+
+class ShardWriter:
+    """
+    writes the games to shard-00000.glog, shard-00001.glog, ... `shard_games`
+    games each. a shard is kept in memory until it is full (or closed)
+    """
+
+    def __init__(self, folder, shard_games=SHARD_GAMES):
+        self.folder = folder
+        self.shard_games = shard_games
+
+        os.makedirs(folder, exist_ok=True)
+
+        self.shard = len(shards(folder))
+        self.games = 0
+        self.records = []
+
+    def write(self, records):
+        self.records += records
+        self.games += 1
+        if self.games == self.shard_games:
+            self.flush()
+
+    def flush(self):
+        if self.records:
+            gamelog.write(os.path.join(self.folder, "shard-%05d.glog" % self.shard), self.records)
+            self.shard += 1
+        self.records = []
+        self.games = 0
+
+    def close(self):
+        self.flush()
+
+
+def shards(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(fn for fn in os.listdir(folder) if fn.startswith("shard-") and fn.endswith(".glog"))
+
+
+def existing_games(folder):
+    """ the next game number after the games in the shards of `folder` """
+    last = -1
+    for fn in shards(folder):
+        g = gamelog.GameLog(os.path.join(folder, fn))
+        if len(g):
+            last = max(last, int(g.columns["game"].max()))
+    return last + 1
+
+
+class Farm:
+
+    def __init__(self, folder, specs=("VanGame", "VanGame", "VanGame"), opening=6, workers=None, seed=0,
+                 shard_games=SHARD_GAMES):
+        self.folder = folder
+        self.specs = list(specs)
+        self.opening = opening
+        self.workers = workers
+        self.seed = seed
+        self.shard_games = shard_games
+
+    def tasks(self, first, games):
+        for game in range(first, first + games):
+            # seed and opening only depend on the game number
+            rng = random.Random("%d-%d" % (self.seed, game))
+            yield self.specs, game, rng.getrandbits(32), rng.randint(0, self.opening)
+
+    def run(self, games, verbose=True):
+        first = existing_games(self.folder)
+        writer = ShardWriter(self.folder, self.shard_games)
+
+        stats = {"games": 0, "positions": 0, "draws": 0, "seconds": 0.0}
+        start = last = time.time()
+
+        with Pool(self.workers) as pool:
+            try:
+                for records, winner in pool.imap_unordered(play_one, self.tasks(first, games)):
+                    writer.write(records)
+
+                    stats["games"] += 1
+                    stats["positions"] += sum(len(r["rew"]) for r in records)
+                    if winner is None:
+                        stats["draws"] += 1
+
+                    if verbose and time.time() - last > REPORT:
+                        last = time.time()
+                        print(self.report(stats, last - start))
+            finally:
+                writer.close()
+
+        stats["seconds"] = time.time() - start
+        stats["games_per_hour"] = 3600 * stats["games"] / stats["seconds"]
+        stats["positions_per_hour"] = 3600 * stats["positions"] / stats["seconds"]
+
+        with open(os.path.join(self.folder, "stats-%d.json" % first), "w") as f:
+            json.dump(stats, f, indent=1)
+
+        if verbose:
+            print(self.report(stats, stats["seconds"]))
+
+        return stats
+
+    @staticmethod
+    def report(stats, seconds):
+        return "%d games (%d draws), %d positions in %.0fs: %.0f games/hour, %.0f positions/hour" % (
+            stats["games"], stats["draws"], stats["positions"], seconds,
+            3600 * stats["games"] / seconds, 3600 * stats["positions"] / seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="play self-play games in parallel and keep their logs")
+    parser.add_argument("folder", help="where the shards go")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", nargs=3, default=["VanGame"] * 3, help="packages of red, green and blue")
+    parser.add_argument("--opening", type=int, default=6, help="most random actions at the start of a game")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--shard-games", type=int, default=SHARD_GAMES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    Farm(args.folder, args.players, args.opening, args.workers, args.seed, args.shard_games).run(args.games)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,155 @@ import VanGame.utils as utils
 import pickle
 import os
 
+# models are looked up next to this file, not in the working directory
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (arch, params) of every model loaded so far, by path and precision, shared by
+# all the players in the process
+_MODELS = {}
+
+# how the weights are kept in memory:
+#   float64  the stored float32 weights widened, computed in float64, the
+#            reference the others are compared with (benchmark.py)
+#   float32  default
+#   float16  half the size, widened to float32 in every layer
+#   int8     a quarter of the size, one scale per layer (max |w| / 127),
+#            accumulated in float32 and rescaled after the dot product
+PRECISIONS = ("float64", "float32", "float16", "int8")
+
+
+def model_path(filename):
+    """
+    full path of a model, `filename` + ".npz" if there is one, else the old pickle
+    """
+    path = os.path.join(MODEL_DIR, filename)
+    if not path.endswith(".npz") and os.path.exists(path + ".npz"):
+        return path + ".npz"
+    return path
+
+
+def load_model(filename, precision="float32"):
+    """
+    arch and params of a model, read from disk only the first time
+    """
+    if precision not in PRECISIONS:
+        raise ValueError("unknown precision %s, expected one of %s" % (precision, PRECISIONS))
+
+    path = model_path(filename)
+
+    if (path, precision) not in _MODELS:
+        if path.endswith(".npz"):
+            arch, params = load_npz(path)
+        else:
+            arch, params = load_pickle(path)
+        _MODELS[(path, precision)] = arch, quantise(arch, params, precision)
+
+    return _MODELS[(path, precision)]
+
+
+def quantise(arch, params, precision):
+    """
+    params with the weights in `precision`, biases stay float32 (widened for
+    float64). an int8 layer gets its scale as scale0, scale1, ...
+    """
+    if precision == "float32":
+        return params
+
+    res = {}
+    for l in range(len(arch)):
+        weight = params['weight' + str(l)].astype(np.float64)
+        bias = params['bias' + str(l)]
+
+        if precision == "int8":
+            scale = np.abs(weight).max() / 127
+            if scale == 0:
+                scale = 1.0
+            weight = np.round(weight / scale).astype(np.int8)
+            res['scale' + str(l)] = np.float32(scale)
+        else:
+            weight = weight.astype(precision)
+
+        if precision == "float64":
+            bias = bias.astype(np.float64)
+
+        weight.flags.writeable = False
+        res['weight' + str(l)] = weight
+        res['bias' + str(l)] = bias
+
+    return res
+
+
+def _layer(weight, bias, activation):
+    # float32 and C contiguous, the way BLAS wants them; read only since they are shared
+    weight = np.ascontiguousarray(weight, dtype=np.float32)
+    bias = np.ascontiguousarray(bias, dtype=np.float32)
+    weight.flags.writeable = False
+    bias.flags.writeable = False
+
+    prop = {"input_size": weight.shape[0], "output_size": weight.shape[1], "activation": activation}
+    return prop, weight, bias
+
+
+def load_npz(path):
+    """
+    npz with weight0, bias0, weight1, ... and the activation of each layer
+    """
+    arch = []
+    params = {}
+
+    with np.load(path) as data:
+        activations = [str(a) for a in data["activations"]]
+        for l, activation in enumerate(activations):
+            prop, params['weight' + str(l)], params['bias' + str(l)] = \
+                _layer(data['weight' + str(l)], data['bias' + str(l)], activation)
+            arch.append(prop)
+
+    return arch, params
+
+
+def load_pickle(path):
+    """
+    the old format, a pickled list [weight0, bias0, weight1, ...], relu
+    everywhere but the last layer
+    """
+    with open(path, 'rb') as f:
+        m = pickle.load(f)
+
+    arch = []
+    params = {}
+    n = len(m) // 2
+
+    for l in range(n):
+        activation = 'linear' if l == n - 1 else 'relu'
+        prop, params['weight' + str(l)], params['bias' + str(l)] = _layer(m[2 * l], m[2 * l + 1], activation)
+        arch.append(prop)
+
+    return arch, params
+
+
+def save_npz(path, arch, params):
+    arrays = {}
+    for l in range(len(arch)):
+        weight = params['weight' + str(l)].astype(np.float32)
+        if 'scale' + str(l) in params:
+            weight = weight * params['scale' + str(l)]
+        arrays['weight' + str(l)] = weight
+        arrays['bias' + str(l)] = params['bias' + str(l)].astype(np.float32)
+
+    np.savez(path, activations=np.array([p['activation'] for p in arch]), **arrays)
+
+
+def convert(src='trained_model', dst='trained_model.npz'):
+    """
+    write the pickled model `src` as an npz model `dst` (both next to this file)
+    """
+    arch, params = load_pickle(os.path.join(MODEL_DIR, src))
+    save_npz(os.path.join(MODEL_DIR, dst), arch, params)
+
 
 class dnn:
 
-    def __init__(self, filename='trained_model'):
+    def __init__(self, filename='trained_model', precision="float32"):
 
         self.activation_function = {
                                     "relu": utils.ReLu.forward,
@@ -16,41 +161,53 @@ class dnn:
 
         self.params = {}
         self.arch = []
+        self.precision = precision
+        # anything narrower is computed in float32
+        self.dtype = np.float64 if precision == "float64" else np.float32
         # load the feed-forward NN weights and bias
-        self.load(os.path.join(os.getcwd(), "VanGame", filename))
+        self.load(filename)
 
     def forward(self, i, l, prop):
         activation = self.activation_function[prop['activation']]
         weights = self.params['weight' + str(l)]
         bias = self.params['bias' + str(l)]
-        o = np.dot(i, weights) + bias
-        return activation(o)
+        if weights.dtype != self.dtype:
+            weights = weights.astype(self.dtype)
+        o = np.dot(i, weights)
+        scale = self.params.get('scale' + str(l))
+        if scale is not None:
+            o *= scale
+        return activation(o + bias)
 
     def predict(self, init_input):
-        output = np.array([])
+        output = np.asarray(init_input, dtype=self.dtype)
         for level, prop in enumerate(self.arch):
-            if output.shape[0] != 0:
-                output = self.forward(output, level, prop)
-            else:
-                output = self.forward(init_input, level, prop)
+            output = self.forward(output, level, prop)
 
         return output
 
+    def predict_batch(self, features):
+        """
+        evaluate many inputs in a single forward pass
+        :param features: matrix with one input (e.g. one successor) per row
+        :return: vector with one value per row
+        """
+        return self.predict(features).reshape(-1)
+
     def load(self, filename) -> None:
         """
         load the proper weights
-        :param filename: the name of the file
+        :param filename: the name of the file, relative to this package
         """
+        self.arch, self.params = load_model(filename, self.precision)
 
-        with open(filename, 'rb') as f:
-            m = pickle.load(f)
+    def save(self, filename) -> None:
+        """
+        save the weights as an npz model, always as float32
+        :param filename: the name of the file, relative to this package
+        """
+        save_npz(os.path.join(MODEL_DIR, filename), self.arch, self.params)
 
-        for i in range(len(m)):
-            if i % 2 == 0:
-                self.arch.append({"input_size": m[i].shape[0], "output_size": m[i].shape[1], "activation": "relu"})
-                self.params['weight' + str(i // 2)] = m[i]
-            else:
-                self.params['bias' + str(i // 2)] = m[i]
 
-        self.arch[-1]['activation'] = 'linear'
-        # print(self.params)
+if __name__ == "__main__":
+    convert()
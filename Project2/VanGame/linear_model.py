@@ -1,10 +1,183 @@
+import VanGame.keras_model as ker_m
+import VanGame.config as config
+import VanGame.train as train
 import numpy as np
+import argparse
+import os
+
+'''
+    linear value model over the strategy.get_board rows, value = x . w + b.
+
+    same params layout as keras_model.dnn with a single linear layer
+    (weight0 (n, 1), bias0 (1,)), so either can load the other's npz, and the
+    current trained_model is one already.
+
+    fit solves ridge regression in closed form. fit_files streams game logs
+    and only keeps the (n + 1) x (n + 1) normal equations in memory. after
+    start_rls, update does recursive least squares on new batches, for
+    learning alongside self-play.
+
+    the CLI saves to config.LINEAR_MODEL, what strategy.py plays with when
+    config.VALUE_MODEL is "linear".
+
+        python -m VanGame.linear_model rec --ridge 1.0
+'''
+
+N_FEATURES = 11
+
+
+def default_model():
+    """ config.LINEAR_MODEL, or trained_model while there is no such file """
+    if os.path.exists(ker_m.model_path(config.LINEAR_MODEL)):
+        return config.LINEAR_MODEL
+    return 'trained_model'
 
 
 class LinearModel:
 
-    def __init__(self):
-        params = {}
+    def __init__(self, filename=None, n_features=N_FEATURES):
+        self.arch = [{"input_size": n_features, "output_size": 1, "activation": "linear"}]
+        self.params = {"weight0": np.zeros((n_features, 1)), "bias0": np.zeros(1)}
+
+        # recursive least squares state, see start_rls
+        self.P = None
+        self.forget = 1.0
+
+        if filename is not None:
+            self.load(filename)
+
+    @property
+    def n_features(self):
+        return self.arch[0]["input_size"]
+
+    def predict(self, init_input):
+        """ value of a row or of every row of a matrix ((n, 1), like dnn.predict) """
+        return np.asarray(init_input, dtype=np.float64) @ self.params["weight0"] + self.params["bias0"]
+
+    def predict_batch(self, features):
+        """
+        evaluate many inputs with one matrix-vector product
+        :param features: matrix with one input (e.g. one successor) per row
+        :return: vector with one value per row
+        """
+        return self.predict(features).reshape(-1)
+
+    def load(self, filename) -> None:
+        """
+        load a single linear layer model
+        :param filename: the name of the file, relative to the VanGame package
+        """
+        arch, params = ker_m.load_model(filename, "float64")
+        if len(arch) != 1 or arch[0]["activation"] != "linear" or arch[0]["output_size"] != 1:
+            raise ValueError("%s is not a linear model" % filename)
+
+        self.arch = [dict(arch[0])]
+        self.params = {"weight0": np.array(params["weight0"], dtype=np.float64),
+                       "bias0": np.array(params["bias0"], dtype=np.float64)}
+
+    def save(self, filename) -> None:
+        """
+        save the weights as an npz model
+        :param filename: the name of the file, relative to the VanGame package
+        """
+        ker_m.save_npz(os.path.join(ker_m.MODEL_DIR, filename), self.arch, self.params)
+
+    @property
+    def theta(self):
+        """ weights and bias as one vector """
+        return np.append(self.params["weight0"][:, 0], self.params["bias0"][0])
+
+    @theta.setter
+    def theta(self, value):
+        self.params["weight0"] = np.array(value[:-1], dtype=np.float64).reshape(-1, 1)
+        self.params["bias0"] = np.array(value[-1:], dtype=np.float64)
+
+    @staticmethod
+    def augment(x):
+        """ rows with a 1 appended for the bias """
+        x = np.asarray(x, dtype=np.float64)
+        return np.hstack([x, np.ones((len(x), 1))])
+
+    def solve(self, A, c, ridge=0.0):
+        """ weights from the normal equations A theta = c, ridge on the weights only """
+        reg = np.full(len(A), float(ridge))
+        reg[-1] = 0.0
+        self.theta = np.linalg.lstsq(A + np.diag(reg), c, rcond=None)[0]
+
+    def fit(self, x, y, ridge=0.0):
+        """ least squares (ridge if > 0) fit to rows `x` and targets `y` """
+        xa = self.augment(x)
+        y = np.asarray(y, dtype=np.float64).reshape(-1)
+        self.solve(xa.T @ xa, xa.T @ y, ridge)
+        return self
+
+    def fit_files(self, files, ridge=0.0, discount_rate=config.DISCOUNT_RATE, holdout=0.0):
+        """
+        fit to the discounted returns of the games in `files` (see
+        train.game_data), but the `holdout` share kept to test on
+        """
+        d = self.n_features + 1
+        A = np.zeros((d, d))
+        c = np.zeros(d)
+        n = 0
+        for x, y in train.batches(files, 4096, 4096, discount_rate, holdout=holdout):
+            xa = self.augment(x)
+            A += xa.T @ xa
+            c += xa.T @ y.reshape(-1)
+            n += len(x)
+
+        if n:
+            self.solve(A, c, ridge)
+        return n
+
+    def start_rls(self, delta=100.0, forget=1.0):
+        """
+        start recursive least squares from the current weights, `delta` is the
+        prior variance of the weights (small keeps them close), `forget` < 1
+        weighs older data down
+        """
+        self.P = np.eye(self.n_features + 1) * delta
+        self.forget = forget
+
+    def update(self, x, y):
+        """ one recursive least squares step with a batch of rows and targets """
+        if self.P is None:
+            self.start_rls()
+
+        xa = self.augment(x)
+        y = np.asarray(y, dtype=np.float64).reshape(-1)
+        theta = self.theta
+
+        # gain for the whole batch at once (Woodbury identity)
+        px = self.P @ xa.T
+        gain = np.linalg.solve(self.forget * np.eye(len(xa)) + xa @ px, px.T).T
+
+        self.theta = theta + gain @ (y - xa @ theta)
+        self.P = (self.P - gain @ px.T) / self.forget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fit the linear VanGame value model to game logs")
+    parser.add_argument("folders", nargs="*", default=["rec"], help="folders of VanGame game logs")
+    parser.add_argument("--ridge", type=float, default=1.0)
+    parser.add_argument("--discount", type=float, default=config.DISCOUNT_RATE)
+    parser.add_argument("--holdout", type=float, default=0.1, help="fraction of games kept to test on")
+    parser.add_argument("--out", default=config.LINEAR_MODEL + ".npz", help="saved next to keras_model.py")
+    args = parser.parse_args()
+
+    files = train.log_files(args.folders)
+
+    model = LinearModel()
+    n = model.fit_files(files, args.ridge, args.discount, args.holdout)
+    print("%d positions, train %.4g" % (n, train.evaluate(model, files, discount_rate=args.discount,
+                                                          holdout=args.holdout)))
+    if args.holdout > 0:
+        games, positions = train.count_games(files, holdout=args.holdout, test=True)
+        loss = train.evaluate(model, files, discount_rate=args.discount, holdout=args.holdout, test=True)
+        print("%d games, %d positions, test %.4g" % (games, positions, loss))
+
+    model.save(args.out)
+
 
-    def load(self):
-        pass
+if __name__ == "__main__":
+    main()
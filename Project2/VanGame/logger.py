@@ -1,6 +1,7 @@
+import shared.gamelog as gamelog
 import datetime
-import json, time
-import os.path
+import time
+import os
 
 EXPFOPATH = "./rec"
 
@@ -10,6 +11,9 @@ class Logger:
         self.log = []
         self.colour = colour
 
+        # export_log does nothing when False (e.g. headless games)
+        self.save = True
+
     def add_log(self, nxt_board, *args, **kwargs):
         '''
         log keys:
@@ -22,8 +26,8 @@ class Logger:
         '''
         kwargs["colour"] = self.colour
 
-        new = {str(m): nxt_board[m] for m in nxt_board.keys()}
-        kwargs["board"] = new
+        # one byte per cell, see gamelog.encode_board
+        kwargs["board"] = gamelog.encode_board(nxt_board)
 
         keys = [
             ["action", ("NONE", None)], 
@@ -43,6 +47,9 @@ class Logger:
         )
 
     def update_last_log(self, index, delta):
+        # a piece can be taken before this player has had a turn (e.g. random openings)
+        if not self.log:
+            return
         self.log[len(self.log)-1][index]+= delta
 
     def get_last_log(self, index):
@@ -50,6 +57,9 @@ class Logger:
 
 
     def export_log(self, status):
-        with open(os.path.join(EXPFOPATH, status + str(time.mktime(datetime.datetime.now().timetuple() )) + "cao" + self.colour + "jiba" + ".txt"), "w+") as e:
-            e.write(json.dumps(self.log))
-        
\ No newline at end of file
+        if not self.save:
+            return
+        os.makedirs(EXPFOPATH, exist_ok=True)
+        name = status + str(time.mktime(datetime.datetime.now().timetuple())) + "-" + self.colour + ".glog"
+        outcome = gamelog.WIN if status == "[1win]" else gamelog.LOSS
+        gamelog.write(os.path.join(EXPFOPATH, name), [gamelog.from_log(self.log, self.colour, outcome, "VanGame")])
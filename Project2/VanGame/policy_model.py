@@ -0,0 +1,312 @@
+import VanGame.keras_model as ker_m
+import VanGame.train as train
+import HardCode.symmetry as symmetry
+import HardCode.batch as batch
+import numpy as np
+import argparse
+import time
+import os
+
+'''
+    policy + value network over the whole board, for a tree search that
+    needs a prior over the actions and a value of every leaf.
+
+    input, from the point of view of the player to move (the board turned
+    with HardCode.symmetry so the mover is red): a 37 cell plane for the
+    mover, the next player and the one after, then the exits of the three
+    over 4, N_INPUTS values.
+
+    output, one train.Network with a linear last layer of N_OUTPUTS units:
+        batch.N_ACTIONS logits in the turned board's action ids
+        3 values (tanh) of the mover, the next player and the one after
+    forward turns them back: a prior over the batch.py action ids of the
+    real board, only over legal actions, and a value per colour (red,
+    green, blue), 1 a win, -1 a loss.
+
+    boards, colours (1-3) and exits are as in batch.py, so all the leaves a
+    search has queued (LeafQueue) go through the network in one call.
+
+        python -m VanGame.policy_model train --iterations 20 --out policy_model.npz
+        python -m VanGame.policy_model bench --leaves 4096
+'''
+
+N_CELLS = batch.N_CELLS
+N_INPUTS = 3 * N_CELLS + 3
+N_OUTPUTS = batch.N_ACTIONS + 3
+
+# action ids of the turned board back on the real board
+INVERSE_PERM = symmetry.ACTION_PERM[[0, 2, 1]]
+
+
+def turns(colours):
+    """ steps that turn each board to its mover's point of view """
+    return (1 - np.asarray(colours, dtype=np.intp)) % 3
+
+
+def encode(boards, colours, exits):
+    """ (n, N_INPUTS) network input of boards (n, 37), colours (n,) 1-3 and exits (n, 3) """
+    boards = np.asarray(boards)
+    colours = np.asarray(colours)
+    n = len(boards)
+
+    turned = symmetry.rotate_boards(boards, turns(colours))
+
+    x = np.zeros((n, N_INPUTS))
+    for j in range(3):
+        x[:, j * N_CELLS:(j + 1) * N_CELLS] = turned == j + 1
+
+    # exits of the mover first
+    order = (colours[:, None] - 1 + np.arange(3)) % 3
+    x[:, 3 * N_CELLS:] = np.take_along_axis(np.asarray(exits), order, axis=1) / 4.0
+    return x
+
+
+def masked_softmax(logits, mask):
+    logits = np.where(mask, logits, -np.inf)
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class PolicyValue:
+
+    def __init__(self, network):
+        self.network = network
+
+    @classmethod
+    def build(cls, hidden=(256, 256), seed=0):
+        return cls(train.Network.build([N_INPUTS] + list(hidden), seed, N_OUTPUTS))
+
+    @classmethod
+    def load(cls, filename):
+        return cls(train.Network.load(filename))
+
+    def save(self, filename):
+        """ next to keras_model.py, same format as the value network """
+        self.network.save(os.path.join(ker_m.MODEL_DIR, filename))
+
+    def forward(self, boards, colours, exits, mask=None):
+        """
+        priors (n, batch.N_ACTIONS) over the legal actions (batch.legal_mask
+        unless `mask` is given) and values (n, 3) of red, green and blue
+        """
+        boards = np.asarray(boards)
+        colours = np.asarray(colours)
+        if mask is None:
+            mask = batch.legal_mask(boards, colours)
+
+        out = self.network.predict(encode(boards, colours, exits))
+
+        # logit of real action a is the turned one's, ACTION_PERM[k, a]
+        k = turns(colours)
+        logits = np.take_along_axis(out[:, :batch.N_ACTIONS], symmetry.ACTION_PERM[k], axis=1)
+        priors = masked_softmax(logits, mask)
+
+        # value of colour c is that of the player (c - mover) % 3 on from the mover
+        order = (np.arange(3)[None, :] - (colours[:, None] - 1)) % 3
+        values = np.take_along_axis(np.tanh(out[:, batch.N_ACTIONS:]), order, axis=1)
+
+        return priors, values
+
+    def train_batch(self, boards, colours, exits, actions, results, optimiser, value_weight=1.0):
+        """
+        one step on the cross entropy of the `actions` played plus the squared
+        error of the values against `results` (n, 3) of red, green and blue.
+        returns the two losses
+        """
+        boards = np.asarray(boards)
+        colours = np.asarray(colours)
+        n = len(boards)
+
+        x = encode(boards, colours, exits)
+        out, cache = self.network.forward(x)
+
+        # everything in the turned board's ids and the mover's order
+        k = turns(colours)
+        mask = np.take_along_axis(batch.legal_mask(boards, colours), INVERSE_PERM[k], axis=1)
+        target = symmetry.ACTION_PERM[k, np.asarray(actions)]
+        order = (colours[:, None] - 1 + np.arange(3)) % 3
+        results = np.take_along_axis(np.asarray(results, dtype=np.float64), order, axis=1)
+
+        grad = np.zeros_like(out)
+
+        p = masked_softmax(out[:, :batch.N_ACTIONS], mask)
+        rows = np.arange(n)
+        policy_loss = -np.mean(np.log(p[rows, target] + 1e-12))
+        p[rows, target] -= 1
+        grad[:, :batch.N_ACTIONS] = p / n
+
+        v = np.tanh(out[:, batch.N_ACTIONS:])
+        diff = v - results
+        value_loss = np.mean((diff ** 2).sum(axis=1))
+        grad[:, batch.N_ACTIONS:] = value_weight * 2 * diff * (1 - v ** 2) / n
+
+        optimiser.step(self.network.params, self.network.backward(grad, cache))
+        return float(policy_loss), float(value_loss)
+
+
+class LeafQueue:
+    """
+    leaves a search wants evaluated, evaluate() runs them all through the
+    network at once and returns the priors and values in the order added
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.boards = []
+        self.colours = []
+        self.exits = []
+
+    def __len__(self):
+        return len(self.boards)
+
+    def add(self, board, colour, exits):
+        """ a board row (or board dict), the colour to move (1-3 or name) and exits, returns its index """
+        if isinstance(board, dict):
+            board = batch.from_dict(board)
+        if isinstance(colour, str):
+            colour = batch.COLOURS.index(colour) + 1
+
+        self.boards.append(board)
+        self.colours.append(colour)
+        self.exits.append(exits)
+        return len(self.boards) - 1
+
+    def evaluate(self):
+        if not self.boards:
+            return np.zeros((0, batch.N_ACTIONS)), np.zeros((0, 3))
+
+        res = self.model.forward(np.array(self.boards, dtype=np.int8), np.array(self.colours, dtype=np.int8),
+                                 np.array(self.exits))
+        self.boards, self.colours, self.exits = [], [], []
+        return res
+
+
+def sample(priors, rng):
+    """ one action from each row of priors """
+    u = rng.random((len(priors), 1))
+    a = (np.cumsum(priors, axis=1) < u).sum(axis=1)
+
+    # rounding can leave u past the last sum, take the last action with a prior then
+    n = priors.shape[1]
+    last = n - 1 - np.argmax(priors[:, ::-1] > 0, axis=1)
+    return np.where(a >= n, last, a)
+
+
+def selfplay(model, games=64, rng=None, max_turns=batch.MAX_TURNS):
+    """
+    `games` games of the network against itself, actions drawn from its
+    priors. returns boards, colours, exits, actions of every turn and the
+    results (n, 3) of their games, draws 0
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    g = batch.BatchGames(games, seed=int(rng.integers(1 << 31)))
+    rec = {"board": [], "colour": [], "exits": [], "action": [], "game": []}
+
+    while len(g.playing()) and g.turns < max_turns:
+        live = g.playing()
+        priors, _ = model.forward(g.boards[live], g.colours[live], g.exits[live])
+        actions = sample(priors, rng)
+
+        rec["board"].append(g.boards[live].copy())
+        rec["colour"].append(g.colours[live].copy())
+        rec["exits"].append(g.exits[live].copy())
+        rec["action"].append(actions)
+        rec["game"].append(live)
+
+        g.step(actions)
+
+    data = {k: np.concatenate(v) for k, v in rec.items()}
+
+    # 1 the winner, -1 the others, 0 all if no one won
+    outcome = np.zeros((games, 3))
+    won = g.result > 0
+    outcome[won] = -1
+    outcome[np.flatnonzero(won), g.result[won] - 1] = 1
+    data["results"] = outcome[data["game"]]
+
+    return data
+
+
+def fit(model, iterations=10, games=64, epochs=2, batch_size=256, optimiser=None, seed=0, verbose=True):
+    """ rounds of self-play, each followed by `epochs` passes over its turns """
+    if optimiser is None:
+        optimiser = train.Adam()
+    rng = np.random.default_rng(seed)
+
+    for it in range(iterations):
+        data = selfplay(model, games, rng)
+        n = len(data["action"])
+
+        losses = []
+        for epoch in range(epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                idx = order[start:start + batch_size]
+                losses.append(model.train_batch(data["board"][idx], data["colour"][idx], data["exits"][idx],
+                                                data["action"][idx], data["results"][idx], optimiser))
+
+        if verbose:
+            policy_loss, value_loss = np.mean(losses, axis=0)
+            print("iteration %d: %d turns, policy %.4g value %.4g" % (it + 1, n, policy_loss, value_loss))
+
+    return model
+
+
+def bench(model, leaves=4096, seed=0):
+    """ leaves per second evaluated one at a time and all in one call """
+    data = selfplay(model, 8, np.random.default_rng(seed), max_turns=64)
+    idx = np.resize(np.arange(len(data["action"])), leaves)
+    boards, colours, exits = data["board"][idx], data["colour"][idx], data["exits"][idx]
+
+    start = time.perf_counter()
+    for i in range(min(leaves, 256)):
+        model.forward(boards[i:i + 1], colours[i:i + 1], exits[i:i + 1])
+    single = min(leaves, 256) / (time.perf_counter() - start)
+
+    queue = LeafQueue(model)
+    start = time.perf_counter()
+    for i in range(leaves):
+        queue.add(boards[i], colours[i], exits[i])
+    queue.evaluate()
+    batched = leaves / (time.perf_counter() - start)
+
+    return single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="policy + value network")
+    sub = parser.add_subparsers(dest="command")
+    t = sub.add_parser("train", help="train by self-play")
+    t.add_argument("--init", default=None, help="start from this model (next to keras_model.py)")
+    t.add_argument("--layers", default="256,256", help="hidden layer sizes of a new network")
+    t.add_argument("--iterations", type=int, default=10)
+    t.add_argument("--games", type=int, default=64, help="self-play games per iteration")
+    t.add_argument("--epochs", type=int, default=2)
+    t.add_argument("--batch", type=int, default=256)
+    t.add_argument("--lr", type=float, default=1e-3)
+    t.add_argument("--seed", type=int, default=0)
+    t.add_argument("--out", default="policy_model.npz")
+    b = sub.add_parser("bench", help="leaves per second, one by one and batched")
+    b.add_argument("--model", default=None)
+    b.add_argument("--leaves", type=int, default=4096)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        if args.init:
+            model = PolicyValue.load(args.init)
+        else:
+            model = PolicyValue.build([int(h) for h in args.layers.split(",") if h], args.seed)
+        fit(model, args.iterations, args.games, args.epochs, args.batch, train.Adam(args.lr), args.seed)
+        model.save(args.out)
+    elif args.command == "bench":
+        model = PolicyValue.load(args.model) if args.model else PolicyValue.build()
+        single, batched = bench(model, args.leaves)
+        print("one at a time %.0f leaves/s, batched %.0f leaves/s" % (single, batched))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
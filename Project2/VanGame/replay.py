@@ -0,0 +1,284 @@
+import VanGame.train as train
+import HardCode.batch as batch
+import numpy as np
+import argparse
+import json
+import os
+
+'''
+    replay buffer of transitions (state, action, reward, next state, done)
+    for TD / DQN style training, kept in memory mapped .npy files so it can
+    hold tens of millions of them and survives restarts.
+
+    a folder holds one buffer:
+        meta.json       capacity, state size, next slot, # stored, priorities
+        state.npy       float32 (capacity, dim)
+        next_state.npy  float32 (capacity, dim)
+        action.npy      int16   (capacity,)   batch.py action id, -1 if none
+        reward.npy      float32 (capacity,)
+        done.npy        bool    (capacity,)
+        tree.npy        float64 (2 * leaves,) sum tree of the priorities
+
+    it is a ring, once full every append replaces the oldest transition.
+    about 2 * 4 * dim + 23 bytes per transition, ~110 bytes for the 11 inputs
+    of the dnn, so 30 million take ~3.3GB of disk and only the pages in use
+    of memory.
+
+    prioritised sampling (Schaul et al.) draws transition i with probability
+    p_i^alpha / sum p^alpha, from a sum tree stored as an array: node k has
+    children 2k and 2k + 1, the root is node 1 and leaf i is node leaves + i.
+
+        python -m VanGame.replay fill buffer rec --capacity 30000000
+'''
+
+ALPHA = 0.6
+
+# size of a new buffer
+CAPACITY = 1000000
+DIM = 11
+
+# added to |td error| so no transition gets priority 0
+EPS = 1e-3
+
+
+class ReplayBuffer:
+
+    def __init__(self, folder, capacity=None, dim=None, alpha=None):
+        """
+        opens the buffer in `folder`, or makes an empty one of `capacity`
+        transitions (CAPACITY) with states of `dim` values (DIM) if there is
+        none. an existing buffer keeps its own sizes, giving
+        other ones is an error
+        """
+        self.folder = folder
+
+        given = {"capacity": capacity, "dim": dim, "alpha": alpha}
+
+        meta = os.path.join(folder, "meta.json")
+        if os.path.exists(meta):
+            with open(meta) as f:
+                m = json.load(f)
+            for k, v in given.items():
+                if v is not None and v != m[k]:
+                    raise ValueError("the replay buffer in %s has %s %s, not %s" % (folder, k, m[k], v))
+            mode = "r+"
+        else:
+            os.makedirs(folder, exist_ok=True)
+            m = {"capacity": CAPACITY, "dim": DIM, "alpha": ALPHA, "pos": 0, "size": 0, "max_priority": 1.0}
+            m.update({k: v for k, v in given.items() if v is not None})
+            mode = "w+"
+
+        self.capacity = m["capacity"]
+        self.dim = m["dim"]
+        self.alpha = m["alpha"]
+        self.pos = m["pos"]
+        self.size = m["size"]
+        self.max_priority = m["max_priority"]
+
+        # leaves of the sum tree, a power of 2
+        self.leaves = 1 << max(0, (self.capacity - 1).bit_length())
+
+        self.state = self._open("state", np.float32, (self.capacity, self.dim), mode)
+        self.next_state = self._open("next_state", np.float32, (self.capacity, self.dim), mode)
+        self.action = self._open("action", np.int16, (self.capacity, ), mode)
+        self.reward = self._open("reward", np.float32, (self.capacity, ), mode)
+        self.done = self._open("done", np.bool_, (self.capacity, ), mode)
+        self.tree = self._open("tree", np.float64, (2 * self.leaves, ), mode)
+
+        if mode == "w+":
+            self.flush()
+
+    def _open(self, name, dtype, shape, mode):
+        path = os.path.join(self.folder, name + ".npy")
+        if mode == "w+":
+            return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        return np.load(path, mmap_mode="r+")
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done, priority=None):
+        """ one transition, at the highest priority so far unless given """
+        i = self.pos
+        self.state[i] = state
+        self.next_state[i] = next_state
+        self.action[i] = action
+        self.reward[i] = reward
+        self.done[i] = done
+
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+        p = self.max_priority if priority is None else priority
+        self.max_priority = max(self.max_priority, p)
+
+        # one leaf, cheaper to add the change to the nodes above it than to resum them
+        tree = self.tree
+        node = i + self.leaves
+        delta = p ** self.alpha - tree[node]
+        while node:
+            tree[node] += delta
+            node >>= 1
+
+    def extend(self, states, actions, rewards, next_states, dones, priorities=None):
+        """ many transitions at once, in order """
+        n = len(rewards)
+        if n > self.capacity:
+            # only the last capacity of them would be kept anyway
+            cut = n - self.capacity
+            states, actions, rewards, next_states, dones = \
+                states[cut:], actions[cut:], rewards[cut:], next_states[cut:], dones[cut:]
+            if priorities is not None:
+                priorities = priorities[cut:]
+            n = self.capacity
+
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.state[idx] = states
+        self.next_state[idx] = next_states
+        self.action[idx] = actions
+        self.reward[idx] = rewards
+        self.done[idx] = dones
+
+        self.pos = int((self.pos + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+
+        if priorities is None:
+            priorities = np.full(n, self.max_priority)
+        self._set(idx, np.asarray(priorities, dtype=np.float64))
+
+    def add_episode(self, states, actions, rewards):
+        """
+        the transitions of one game from its states in order, the last one
+        is done (its next state is all zeros)
+        """
+        states = np.asarray(states, dtype=np.float32)
+        n = len(states)
+        if not n:
+            return
+
+        next_states = np.zeros_like(states)
+        next_states[:-1] = states[1:]
+        dones = np.zeros(n, dtype=bool)
+        dones[-1] = True
+
+        self.extend(states, actions, rewards, next_states, dones)
+
+    def _set(self, idx, priorities):
+        """ priorities of the transitions `idx`, then the sums above them level by level """
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+        node = idx + self.leaves
+        self.tree[node] = priorities ** self.alpha
+        while node[0] > 1:
+            node = np.unique(node // 2)
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+
+    def total(self):
+        return float(self.tree[1])
+
+    def batch(self, idx):
+        return {
+            "state": self.state[idx],
+            "action": self.action[idx],
+            "reward": self.reward[idx],
+            "next_state": self.next_state[idx],
+            "done": self.done[idx]
+        }
+
+    def _check_not_empty(self):
+        if self.size == 0:
+            raise ValueError("cannot sample from the empty replay buffer in %s" % self.folder)
+
+    def sample(self, n, rng=None):
+        """ (indices, transitions) of `n` transitions drawn uniformly """
+        self._check_not_empty()
+        if rng is None:
+            rng = np.random.default_rng()
+        idx = rng.integers(0, self.size, n)
+        return idx, self.batch(idx)
+
+    def sample_prioritised(self, n, beta=0.4, rng=None):
+        """
+        (indices, transitions, importance weights) of `n` transitions drawn by
+        priority, one from each of n equal slices of the total so a batch
+        covers the whole range. the weights (size * P(i))^-beta are scaled to
+        at most 1
+        """
+        self._check_not_empty()
+        if rng is None:
+            rng = np.random.default_rng()
+
+        total = self.total()
+        u = (np.arange(n) + rng.random(n)) * (total / n)
+
+        # walk down from the root, going right past the left child's sum
+        node = np.ones(n, dtype=np.intp)
+        while node[0] < self.leaves:
+            left = self.tree[2 * node]
+            right = u > left
+            u = np.where(right, u - left, u)
+            node = 2 * node + right
+
+        # rounding can end a walk just past the stored transitions
+        idx = np.minimum(node - self.leaves, self.size - 1)
+
+        prob = self.tree[idx + self.leaves] / total
+        weights = (self.size * prob) ** -beta
+        weights /= weights.max()
+
+        return idx, self.batch(idx), weights
+
+    def update_priorities(self, idx, td_errors):
+        """ new priorities of sampled transitions from their td errors """
+        self._set(np.asarray(idx), np.abs(np.asarray(td_errors, dtype=np.float64)) + EPS)
+
+    def flush(self):
+        """ write everything to disk, the buffer opens in this state again """
+        for a in (self.state, self.next_state, self.action, self.reward, self.done, self.tree):
+            a.flush()
+
+        meta = {"capacity": self.capacity, "dim": self.dim, "alpha": self.alpha, "pos": self.pos,
+                "size": self.size, "max_priority": self.max_priority}
+        path = os.path.join(self.folder, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+
+def fill(buffer, files, package="VanGame"):
+    """ add every game of `package` in the game logs `files`, returns # of transitions """
+    n = 0
+    for path in files:
+        for game in train.read_games(path, package):
+            buffer.add_episode(train.inputs(game), batch.encode_actions(game["action"]), game["rew"])
+            n += len(game["rew"])
+    buffer.flush()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory mapped replay buffer")
+    sub = parser.add_subparsers(dest="command")
+    f = sub.add_parser("fill", help="add the VanGame games of game logs to a buffer")
+    f.add_argument("buffer", help="folder of the buffer, made if it does not exist")
+    f.add_argument("folders", nargs="+")
+    f.add_argument("--capacity", type=int, default=None, help="of a new buffer, %d by default" % CAPACITY)
+    f.add_argument("--alpha", type=float, default=None, help="of a new buffer, %s by default" % ALPHA)
+    i = sub.add_parser("info")
+    i.add_argument("buffer")
+    args = parser.parse_args()
+
+    if args.command == "fill":
+        buffer = ReplayBuffer(args.buffer, args.capacity, alpha=args.alpha)
+        n = fill(buffer, train.log_files(args.folders))
+        print("added %d transitions, %d of %d stored" % (n, len(buffer), buffer.capacity))
+    elif args.command == "info":
+        buffer = ReplayBuffer(args.buffer)
+        print("%d of %d transitions, state size %d, priority total %.4g" % (
+            len(buffer), buffer.capacity, buffer.dim, buffer.total()))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,42 +2,46 @@ import VanGame.utils as utils
 import VanGame.config as config
 import VanGame.logger as logger
 import VanGame.keras_model as ker_m
-import queue
+import VanGame.linear_model as lin_m
+import shared.bitboard as bitboard
+import shared.cache as cache
+import shared.evaluation as evaluation
+import shared.distance as distance
+import numpy as np
 import copy
 
 
 class Strategy:
 
     def __init__(self, goals, colour):
-        self.cost = {
-            "red": {},
-            "blue": {},
-            "green": {}
-        }
-
         self.colour = colour
 
         self.goals = goals
 
         self.arrange = config.MAIN[self.colour]
 
-        tmp_current_board = {x: "empty" for x in config.CELLS}
-
-        for g in self.goals:
-            self.cost_from_goal(g, tmp_current_board, colour)
-        # utils.print_board(self.cost[colour])
-
-        for g in config.GOALS:
-            if g != colour:
-                for go in config.GOALS[g]:
-                    self.cost_from_goal(go, tmp_current_board, g)
-                # utils.print_board(self.cost[g])
+        # cost to the goals of each colour on the empty board
+        all_goals = dict(config.GOALS)
+        all_goals[colour] = self.goals
+        self.cost = {c: distance.as_dict(t) for c, t in distance.cost_tables(all_goals).items()}
 
         self.turn = 0
         
         self.logger = logger.Logger(self.colour)
 
-        self.mdl = ker_m.dnn()
+        if config.VALUE_MODEL == "linear":
+            self.mdl = lin_m.LinearModel(lin_m.default_model())
+        else:
+            self.mdl = ker_m.dnn(precision=config.MODEL_PRECISION)
+
+        # ev feature, same features as HardCode with the weights in config
+        self.evaluator = evaluation.Evaluation(config.EVAL_WEIGHTS)
+
+        # cal_all of successors seen in earlier turns
+        self.evals = cache.EvalCache(config.CACHE_SIZE, config.CACHE_ENABLED)
+
+        # draws the action in utils.chose, headless.play seeds it for a game
+        self.rng = np.random.default_rng()
 
 
     def get_possible_moves(self, current_board, colour, colour_p, goal, colour_e):
@@ -65,13 +69,16 @@ class Strategy:
             
             acs = []
 
-            all_score = []
+            all_n = []
             all_suc = []
             all_cald = []
 
             ie = -1
 
             if len(all_ms):
+                cur_key = cache.board_hash(current_board)
+                exits = cache.exits_key(colour_e)
+
                 for ms in all_ms:
                     if ms[2] == 1:
                         m_action = ("MOVE", (ms[0], ms[1]))
@@ -83,28 +90,29 @@ class Strategy:
                     
                     # next board after the action
                     next_bor = self.get_next_curbo(current_board, m_action, colour)
-                    cald = self.cal_all(current_board, next_bor, colour, colour_e,colour_p)
 
-                    d_heurii = cald[1]
-                    uti = cald[2]
-                    ev = cald[3]
+                    # same parent and successor give the same cal_all
+                    key = (cur_key, cache.board_hash(next_bor), colour, exits)
+                    cald = self.evals.get(key)
+                    if cald is None:
+                        cald = self.cal_all(current_board, next_bor, colour, colour_e,colour_p)
+                        self.evals.put(key, cald)
 
                     all_cald.append(cald)
 
                     # board in num representation used in predicting
-                    next_n = self.get_board(next_bor, colour, self.turn, cald)
-                    # print(next_n)
-                    # print(next_n)
-                    # add the estimate utility value
-                    all_score.append(self.mdl.predict(next_n))
+                    all_n.append(self.get_board(next_bor, colour, self.turn, cald))
 
                     # add the next board to be chosen later
                     all_suc.append(next_bor)
 
                     # return all_ms[math.floor(random.random() * len(all_ms))]
-                
+
+                # estimate utility value of all the successors in one forward pass
+                all_score = self.mdl.predict_batch(np.array(all_n))
+
                 # get the right action chosen in this status
-                ie = utils.chose(all_score)
+                ie = utils.chose(all_score, self.rng)
                 action = acs[ie]
                 suc_bo = all_suc[ie]
                 final_cald = all_cald[ie]
@@ -243,25 +251,7 @@ class Strategy:
         return n_s - c_ors
 
     def cal_dpiei(self, cur_state, next_state,colour):
-        nxt_pl = [k for k in next_state.keys() if next_state[k] == colour]
-        nxt_ot = [k for k in next_state.keys() if next_state[k] != "empty" and next_state[k] != colour]
-
-        tmp_current_board = {x: "empty" for x in config.CELLS}
-        for p in nxt_pl:
-            tmp_current_board[p] = "n"
-        for p in nxt_ot:
-            tmp_current_board[p] = "n"
-
-        dengr = set({})
-        
-        for p in nxt_ot:
-            p_nxt = utils.find_next(p, tmp_current_board)
-            for d in p_nxt:
-                if d[2] == 2:
-                    if d[3] in nxt_pl:
-                        dengr.add(d[3])
-        
-        return len(dengr)
+        return bitboard.danger(bitboard.masks(next_state), colour)
 
     def hard_code_eva_function(self, pieces_difference : int, reduced_heuristic : float, danger_pieces : int, players, player_exit) -> float:
         """
@@ -269,12 +259,7 @@ class Strategy:
         2. reduced heuristic to dest (positive means increased, negative means decreased) *(-2)
         3. # of piece in danger (could be taken by opponent by one JUMP action) *(-5)
         """
-        # print(pieces_difference, reduced_heuristic, danger_pieces)
-        t = len(players) + player_exit
-        if t < 4:
-            return (20) *pieces_difference + (-2)*reduced_heuristic + danger_pieces * (-10)
-        else:
-            return (5) *pieces_difference + (-8)*reduced_heuristic + danger_pieces * (-20)
+        return self.evaluator.score(pieces_difference, reduced_heuristic, danger_pieces, players, player_exit, ("None", None))
 
 
     def check_heuristic_rew(self, colour_exit, suc_bo, colour, d_heur):
@@ -307,58 +292,3 @@ class Strategy:
 
         return the_br
 
-
-    def cost_from_goal(self, goal: tuple, tmp_current_board: dict, colour) -> None:
-        """
-        Receive a goal coordinate and block list then calculate a pre
-        """
-
-        q = queue.Queue()
-
-        # (cost_from_goal, ((MOVE_counter, JUMP_counter), coordinates))
-        q.put((0, ((0, 0), goal)))
-
-        cost = {goal: 0}
-
-        self.cost[colour][goal] = 1
-
-        while not q.empty():
-
-            current = q.get()
-
-            successors = utils.find_next(current[1][1], tmp_current_board)
-            child_cost = current[0] + 1
-
-            for s in successors:
-                if s[1] not in cost:
-                    # since we are using BFS to findNext the coordinates
-                    # better solution will be always expanded first
-
-                    # s[1] indicates if the next move s is achieved by move (1) or jump (2)
-                    # used in calculating heuristic g
-                    # which separately consider jump and moves since jump does not need to /2
-                    # to reach a admissible heuristic
-                    # toSuc = (MOVE_counter, JUMP_counter) <- counting both moves and jumps
-                    if s[2] == 1:
-                        s_counter = (current[1][0][0] + 1, current[1][0][1])
-                    elif s[2] == 2:
-                        s_counter = (current[1][0][0], current[1][0][1] + 1)
-
-                    q.put((child_cost, (s_counter, s[1])))
-                    cost[s[1]] = child_cost
-
-                    # if the cost less then update the closest cost
-                    h = s_counter[0] + 1
-
-                    '''if s_counter[0] % 2 == 0:
-                        h = h + (s_counter[0] / 2 + s_counter[1] + 1)
-                    else:
-                        h = h + ((s_counter[0] - 1) / 2 + s_counter[1] + 2)'''
-
-                    if s[1] not in self.cost[colour]:
-                        self.cost[colour][s[1]] = h
-                    elif self.cost[colour][s[1]] > h:
-                        self.cost[colour][s[1]] = h
-
-        return
-
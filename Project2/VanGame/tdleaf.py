@@ -0,0 +1,268 @@
+import VanGame.keras_model as ker_m
+import VanGame.config as config
+import VanGame.train as train
+import HardCode.config as hc_config
+import shared.evaluation as evaluation
+import shared.gamelog as gamelog
+import referee.headless as headless
+import numpy as np
+import argparse
+
+'''
+    TDLeaf(lambda), learns the evaluation from the leaves of the principal
+    variation of every turn of a game.
+
+    HardCode and VanGame search one ply, so the PV leaf of a turn is just the
+    successor that was played, and a game log already holds one leaf per turn:
+    the evaluation features for HardCode (log column "features", fed to the
+    linear hard_code_eva_function weights) or the strategy.get_board row for
+    VanGame (fed to the dnn).
+
+    leaf values are squashed, v = tanh(BETA * score), and the value after the
+    last turn is the result of the game (1 win, 0 draw, -1 loss). with the
+    temporal differences d_t = v_t+1 - v_t every leaf is moved towards
+
+        v_t + sum_j>=t lambda^(j - t) d_j
+
+    which is the TDLeaf(lambda) update, done for a batch of games at once.
+
+    offline replays logged games (shared.gamelog), online plays self-play games
+    with the weights being learnt and learns from them as they finish.
+
+        python -m VanGame.tdleaf offline hardcode_rec --model linear --out weights.json
+        python -m VanGame.tdleaf online --model linear --games 200 --out weights.json
+'''
+
+LAMBDA = 0.7
+
+# score to value scale, tanh(BETA * score)
+BETA = 0.02
+
+WIN = train.WIN
+DRAW = train.DRAW
+LOSS = train.LOSS
+
+COLOURS = ["red", "green", "blue"]
+
+
+def td_targets(values, outcome, lam=LAMBDA):
+    """ lambda-return of each leaf of a game, values in playing order """
+    d = np.append(values[1:], outcome) - values
+    targets = np.empty_like(values)
+    acc = 0.0
+    for t in reversed(range(len(values))):
+        acc = d[t] + lam * acc
+        targets[t] = values[t] + acc
+    return targets
+
+
+class LinearLearner:
+    """ the weights of evaluation.Evaluation (hard_code_eva_function) """
+
+    package = "HardCode"
+
+    def __init__(self, weights=None, lr=1.0, beta=BETA):
+        if weights is None:
+            weights = hc_config.EVAL_WEIGHTS
+        self.w = np.array(evaluation.Evaluation(weights).weights)
+        self.lr = lr
+        self.beta = beta
+
+    def inputs(self, game):
+        f = np.asarray(game["features"], dtype=np.float64)
+        return f[~np.isnan(f[:, 0])]
+
+    def value(self, x):
+        return np.tanh(self.beta * (x @ self.w))
+
+    def update(self, x, targets):
+        v = self.value(x)
+        # gradient of tanh(beta * x.w) is (1 - v^2) beta x
+        self.w += self.lr * x.T @ ((targets - v) * (1 - v * v) * self.beta) / len(x)
+
+    def player_spec(self):
+        return self.package, {"weights": self.w.tolist()}
+
+    def prepare(self, player):
+        pass
+
+    def save(self, filename):
+        evaluation.Evaluation(self.w).save(filename)
+
+
+class NetworkLearner:
+    """ the weights of the VanGame keras_model.dnn """
+
+    package = "VanGame"
+
+    def __init__(self, network, optimiser=None, beta=BETA):
+        self.network = network
+        self.optimiser = optimiser if optimiser is not None else train.Adam(1e-4)
+        self.beta = beta
+
+    def inputs(self, game):
+        return train.inputs(game)
+
+    def value(self, x):
+        return np.tanh(self.beta * self.network.predict(x).reshape(-1))
+
+    def update(self, x, targets):
+        v = self.value(x)
+        # d/d output of 0.5 * mean((targets - v)^2)
+        grad = -((targets - v) * (1 - v * v) * self.beta / len(x)).reshape(-1, 1)
+        self.network.step(x, grad, self.optimiser)
+
+    def player_spec(self):
+        return self.package
+
+    def prepare(self, player):
+        # play with the network being learnt, not the one on disk
+        if not isinstance(player.strategy.mdl, ker_m.dnn):
+            raise ValueError("the player's value model is a %s, not a keras_model.dnn (config.VALUE_MODEL %r)"
+                             % (type(player.strategy.mdl).__name__, config.VALUE_MODEL))
+        player.strategy.mdl.arch = self.network.arch
+        player.strategy.mdl.params = self.network.params
+
+    def save(self, filename):
+        self.network.save(filename)
+
+
+class TDLeaf:
+
+    def __init__(self, learner, lam=LAMBDA, batch_games=8, seed=0):
+        self.learner = learner
+        self.lam = lam
+        self.batch_games = batch_games
+        self.seed = seed
+
+        self.games = 0
+
+    def learn(self, games):
+        """
+        one update from a batch of (inputs, outcome) games, the inputs are the
+        PV leaves of one player's turns. returns the mean |temporal difference|
+        """
+        xs = []
+        targets = []
+        err = []
+        for x, outcome in games:
+            if not len(x):
+                continue
+            values = self.learner.value(x)
+            t = td_targets(values, outcome, self.lam)
+            xs.append(x)
+            targets.append(t)
+            err.append(np.abs(np.append(values[1:], outcome) - values))
+
+        if not xs:
+            return 0.0
+
+        self.learner.update(np.concatenate(xs), np.concatenate(targets))
+        self.games += len(xs)
+
+        return float(np.concatenate(err).mean())
+
+    def offline(self, files, epochs=1, verbose=True):
+        """ replay logged games, `batch_games` at a time """
+        rng = np.random.RandomState(self.seed)
+        files = list(files)
+
+        for epoch in range(epochs):
+            order = rng.permutation(len(files))
+            err = []
+            games = []
+            for j in order:
+                for game in train.read_games(files[j], self.learner.package):
+                    games.append((self.learner.inputs(game), game["outcome"]))
+                    if len(games) == self.batch_games:
+                        err.append(self.learn(games))
+                        games = []
+            if games:
+                err.append(self.learn(games))
+
+            if verbose:
+                print("epoch %d mean |d| %.4f" % (epoch + 1, np.mean(err) if err else 0.0))
+
+    def play(self, seed, opening=4):
+        """ one self-play game with the current weights in every seat, as (inputs, outcome) per player """
+        players = headless.make_players([self.learner.player_spec()] * 3)
+        for p in players:
+            self.learner.prepare(p)
+
+        res = headless.play(players, opening, seed)
+
+        games = []
+        for colour, p in zip(COLOURS, players):
+            if res["winner"] is None:
+                outcome = DRAW
+            else:
+                outcome = WIN if res["winner"] == colour else LOSS
+            games.append((self.learner.inputs(gamelog.from_log(p.strategy.logger.log)), outcome))
+        return games
+
+    def online(self, games=0, opening=4, out=None, save_every=10, verbose=True):
+        """
+        learn while playing, an update after every `batch_games` players' games.
+        runs forever if `games` is 0, saving to `out` every `save_every` updates
+        """
+        played = 0
+        updates = 0
+        batch = []
+
+        while not games or played < games:
+            batch += self.play(self.seed * 100003 + played, opening)
+            played += 1
+
+            if len(batch) >= self.batch_games:
+                err = self.learn(batch)
+                batch = []
+                updates += 1
+
+                if verbose:
+                    print("game %d mean |d| %.4f" % (played, err))
+                if out and updates % save_every == 0:
+                    self.learner.save(out)
+
+        if batch:
+            self.learn(batch)
+        if out:
+            self.learner.save(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TDLeaf(lambda) on logged or self-play games")
+    parser.add_argument("mode", choices=["offline", "online"])
+    parser.add_argument("folders", nargs="*", default=["hardcode_rec"], help="folders of game logs (offline)")
+    parser.add_argument("--model", choices=["linear", "dnn"], default="linear")
+    parser.add_argument("--init", default=None,
+                        help="weights json (linear) or model next to keras_model.py (dnn), the defaults if not given")
+    parser.add_argument("--lam", type=float, default=LAMBDA)
+    parser.add_argument("--beta", type=float, default=BETA)
+    parser.add_argument("--lr", type=float, default=None)
+    parser.add_argument("--batch-games", type=int, default=8)
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the logs (offline)")
+    parser.add_argument("--games", type=int, default=0, help="self-play games, 0 to run until stopped (online)")
+    parser.add_argument("--opening", type=int, default=4, help="random opening moves (online)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    if args.model == "linear":
+        weights = evaluation.load_weights(args.init) if args.init else None
+        learner = LinearLearner(weights, args.lr if args.lr is not None else 1.0, args.beta)
+    else:
+        network = train.Network.load(args.init or "trained_model")
+        learner = NetworkLearner(network, train.Adam(args.lr if args.lr is not None else 1e-4), args.beta)
+
+    td = TDLeaf(learner, args.lam, args.batch_games, args.seed)
+
+    if args.mode == "offline":
+        td.offline(train.log_files(args.folders), args.epochs)
+        if args.out:
+            learner.save(args.out)
+    else:
+        td.online(args.games, args.opening, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import VanGame.policy_model as policy_model
+import HardCode.symmetry as symmetry
+import HardCode.batch as batch
+import numpy as np
+import pytest
+
+'''
+    checks of the index permutations of policy_model: turning a position
+    turns its priors and values the same way, and train_batch's gradients
+    match finite differences.
+
+        python -m pytest VanGame/test_policy_model.py
+'''
+
+
+class Keep:
+    """ optimiser that only keeps the gradients """
+
+    def step(self, params, grads):
+        self.grads = grads
+
+
+class Nothing:
+
+    def step(self, params, grads):
+        pass
+
+
+@pytest.fixture(scope="module")
+def positions():
+    model = policy_model.PolicyValue.build((32, ), seed=1)
+    return policy_model.selfplay(model, 4, np.random.default_rng(0), max_turns=40)
+
+
+def test_priors_legal(positions):
+    model = policy_model.PolicyValue.build((32, ), seed=2)
+    b, c, e = positions["board"], positions["colour"], positions["exits"]
+
+    priors, values = model.forward(b, c, e)
+
+    assert priors.shape == (len(b), batch.N_ACTIONS) and values.shape == (len(b), 3)
+    np.testing.assert_allclose(priors.sum(axis=1), 1)
+    assert (priors[~batch.legal_mask(b, c)] == 0).all()
+    assert (np.abs(values) <= 1).all()
+
+
+@pytest.mark.parametrize("k", [1, 2])
+def test_equivariant(positions, k):
+    """ the same position turned k steps, every colour k on """
+    model = policy_model.PolicyValue.build((32, ), seed=3)
+    b, c, e = positions["board"], positions["colour"], positions["exits"]
+
+    priors, values = model.forward(b, c, e)
+
+    turned_b = symmetry.rotate_boards(b, k)
+    turned_c = ((c - 1 + k) % 3 + 1).astype(c.dtype)
+    turned_e = np.roll(e, k, axis=1)
+    turned_priors, turned_values = model.forward(turned_b, turned_c, turned_e)
+
+    np.testing.assert_allclose(turned_priors[:, symmetry.ACTION_PERM[k]], priors, atol=1e-12)
+    np.testing.assert_allclose(turned_values, np.roll(values, k, axis=1), atol=1e-12)
+
+
+def test_gradients(positions):
+    model = policy_model.PolicyValue.build((8, ), seed=4)
+    idx = np.arange(0, len(positions["action"]), max(1, len(positions["action"]) // 6))[:6]
+    args = [positions[k][idx] for k in ("board", "colour", "exits", "action", "results")]
+
+    keep = Keep()
+    model.train_batch(*args, keep)
+
+    def loss():
+        return sum(model.train_batch(*args, Nothing()))
+
+    eps = 1e-6
+    for key in ("weight0", "bias0", "weight1", "bias1"):
+        grad = keep.grads[key]
+        w = model.network.params[key]
+
+        # the largest entries, and one of the value outputs for the last layer
+        flat = list(np.argsort(-np.abs(grad).reshape(-1))[:3])
+        if key.endswith("1"):
+            flat.append(grad.size - 2)
+
+        for f in flat:
+            i = np.unravel_index(f, grad.shape)
+            w[i] += eps
+            plus = loss()
+            w[i] -= 2 * eps
+            minus = loss()
+            w[i] += eps
+            assert grad[i] == pytest.approx((plus - minus) / (2 * eps), rel=1e-4, abs=1e-7)
+
+
+def test_sample_never_past_last_legal():
+    priors = np.zeros((2, batch.N_ACTIONS))
+    priors[0, [3, 10]] = [0.5, 0.5 - 1e-9]
+    priors[1, batch.PASS_ACTION] = 1
+
+    class One:
+        def random(self, shape):
+            return np.ones(shape)
+
+    assert list(policy_model.sample(priors, One())) == [10, batch.PASS_ACTION]
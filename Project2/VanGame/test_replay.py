@@ -0,0 +1,104 @@
+import VanGame.replay as replay
+import numpy as np
+import pytest
+
+'''
+    sum tree and error checks of replay.ReplayBuffer.
+
+        python -m pytest VanGame/test_replay.py
+'''
+
+
+def fill(buffer, n, rng):
+    for i in range(n):
+        buffer.append(rng.random(buffer.dim), i % 10, rng.random(), rng.random(buffer.dim), i % 7 == 0,
+                      priority=rng.random() + 0.1)
+
+
+def check_tree(buffer):
+    """ every inner node is the sum of its children, and the root of the leaves """
+    tree = buffer.tree
+    leaves = tree[buffer.leaves:]
+    assert np.isclose(buffer.total(), leaves.sum())
+    for node in range(1, buffer.leaves):
+        assert np.isclose(tree[node], tree[2 * node] + tree[2 * node + 1])
+
+
+def test_tree_after_appends(tmp_path):
+    rng = np.random.default_rng(0)
+    buffer = replay.ReplayBuffer(str(tmp_path / "b"), capacity=37, dim=3)
+
+    # past the capacity, the ring overwrites the oldest
+    fill(buffer, 50, rng)
+
+    assert len(buffer) == 37
+    check_tree(buffer)
+
+
+def test_tree_after_extend_and_update(tmp_path):
+    rng = np.random.default_rng(1)
+    buffer = replay.ReplayBuffer(str(tmp_path / "b"), capacity=100, dim=3)
+
+    n = 80
+    buffer.extend(rng.random((n, 3)), np.zeros(n), rng.random(n), rng.random((n, 3)), np.zeros(n, dtype=bool))
+    check_tree(buffer)
+
+    idx, batch, weights = buffer.sample_prioritised(32, rng=rng)
+    assert idx.min() >= 0 and idx.max() < n
+    assert weights.max() == pytest.approx(1.0)
+
+    errors = rng.normal(size=len(idx))
+    buffer.update_priorities(idx, errors)
+    check_tree(buffer)
+
+    # the last update of a sampled index wins
+    last = {i: e for i, e in zip(idx, errors)}
+    for i, e in last.items():
+        assert buffer.tree[buffer.leaves + i] == pytest.approx((abs(e) + replay.EPS) ** buffer.alpha)
+
+
+def test_prioritised_follows_priorities(tmp_path):
+    rng = np.random.default_rng(2)
+    buffer = replay.ReplayBuffer(str(tmp_path / "b"), capacity=4, dim=1, alpha=1.0)
+    for p in (1.0, 0.0, 3.0, 0.0):
+        buffer.append([0.0], 0, 0.0, [0.0], False, priority=p)
+
+    counts = np.bincount(np.concatenate([buffer.sample_prioritised(40, rng=rng)[0] for _ in range(50)]),
+                         minlength=4)
+    assert counts[1] == counts[3] == 0
+    assert counts[2] / counts[0] == pytest.approx(3.0, rel=0.1)
+
+
+def test_reopen(tmp_path):
+    rng = np.random.default_rng(3)
+    folder = str(tmp_path / "b")
+    buffer = replay.ReplayBuffer(folder, capacity=20, dim=2)
+    fill(buffer, 12, rng)
+    buffer.flush()
+
+    again = replay.ReplayBuffer(folder)
+    assert (again.capacity, again.dim, len(again), again.pos) == (20, 2, 12, 12)
+    assert again.total() == pytest.approx(buffer.total())
+    np.testing.assert_array_equal(again.state[:12], buffer.state[:12])
+
+
+def test_reopen_with_other_sizes(tmp_path):
+    folder = str(tmp_path / "b")
+    replay.ReplayBuffer(folder, capacity=20, dim=2)
+
+    with pytest.raises(ValueError, match="dim"):
+        replay.ReplayBuffer(folder, dim=11)
+    with pytest.raises(ValueError, match="capacity"):
+        replay.ReplayBuffer(folder, capacity=30)
+
+    # the same sizes are fine
+    replay.ReplayBuffer(folder, capacity=20, dim=2)
+
+
+def test_empty(tmp_path):
+    buffer = replay.ReplayBuffer(str(tmp_path / "b"), capacity=5, dim=2)
+
+    with pytest.raises(ValueError, match="empty"):
+        buffer.sample(3)
+    with pytest.raises(ValueError, match="empty"):
+        buffer.sample_prioritised(3)
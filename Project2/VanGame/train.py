@@ -0,0 +1,318 @@
+import VanGame.keras_model as ker_m
+import VanGame.config as config
+import VanGame.utils as utils
+import shared.gamelog as gamelog
+import numpy as np
+import argparse
+import hashlib
+import random
+import os
+
+'''
+    trains the value network from game logs, in numpy only (replaces the keras
+    notebook model_training.ipynb).
+
+    every logged turn (logger.Logger.export_log) is one example: the input is
+    the row strategy.get_board builds, [turn] + utility + [ev], the target is
+    the discounted return of the rewards from that turn to the end of the
+    game (utils.discount_rewards). the loss is the mean squared error.
+
+    logs are read one file at a time into a shuffle buffer and mini-batches
+    are drawn from it, so only the buffer is ever in memory. the games kept
+    aside to test on are picked by a hash of their file and game number
+    (held_out), so the split is the same every run and works for a single
+    shard of many games as well as a folder of one game files. the weights
+    are saved as an npz model that keras_model.dnn loads (--out
+    trained_model.npz replaces the one the player uses).
+
+        python -m VanGame.train rec --epochs 5 --out value_model.npz
+'''
+
+
+# game results, the value of the last turn for TDLeaf
+WIN = float(gamelog.WIN)
+DRAW = float(gamelog.DRAW)
+LOSS = float(gamelog.LOSS)
+
+
+def log_files(folders):
+    """ game logs in `folders`: .glog (see shared.gamelog), old logger .txt and .jsonl shards """
+    res = []
+    for folder in folders:
+        res += [os.path.join(folder, fn) for fn in sorted(os.listdir(folder))
+                if fn.endswith((".glog", ".txt", ".jsonl"))]
+    return res
+
+
+def read_games(path, package=None):
+    """
+    columns of every game in `path` (gamelog.GameLog.game), one player's
+    log each, only the games of `package` if given
+    """
+    return gamelog.read(path, package)
+
+
+def inputs(game):
+    """ the strategy.get_board rows of a game, [turn] + utility + [ev] """
+    return np.column_stack([game["turns"], game["utility"], game["ev"]]).astype(np.float64)
+
+
+def game_data(game, discount_rate=config.DISCOUNT_RATE):
+    """ (inputs, targets) of one game """
+    return inputs(game), utils.discount_rewards(game["rew"], discount_rate)
+
+
+def held_out(path, game, holdout):
+    """ whether game number `game` of the log `path` is in the `holdout` share kept to test on """
+    if holdout <= 0:
+        return False
+    digest = hashlib.md5(("%s-%d" % (os.path.basename(path), game)).encode()).digest()
+    return int.from_bytes(digest[:4], "little") < holdout * (1 << 32)
+
+
+def count_games(files, package="VanGame", holdout=0.0, test=False):
+    """ (games, positions) of `package` in `files`, of one side of the holdout split """
+    games = positions = 0
+    for path in files:
+        for game in read_games(path, package):
+            if held_out(path, game["game"], holdout) == test:
+                games += 1
+                positions += len(game["rew"])
+    return games, positions
+
+
+def batches(files, batch_size=32, buffer_size=10000, discount_rate=config.DISCOUNT_RATE, rng=None,
+            holdout=0.0, test=False):
+    """
+    mini-batches (x, y) streamed from the logs in `files`. with `rng` the files
+    are read in a random order and the examples shuffled within the buffer.
+    only the games kept to test on (held_out) if `test`, else only the others
+    """
+    files = list(files)
+    if rng is not None:
+        rng.shuffle(files)
+
+    buf_x = []
+    buf_y = []
+    size = 0
+
+    def drain(keep):
+        """ batches out of the buffer until only `keep` examples are left """
+        x = np.concatenate(buf_x)
+        y = np.concatenate(buf_y).reshape(-1, 1)
+        if rng is not None:
+            idx = np.random.RandomState(rng.getrandbits(32)).permutation(len(x))
+            x, y = x[idx], y[idx]
+
+        end = 0
+        while len(x) - end > keep:
+            yield x[end:end + batch_size], y[end:end + batch_size]
+            end += batch_size
+
+        buf_x[:] = [x[end:]]
+        buf_y[:] = [y[end:].reshape(-1)]
+        return len(x) - end
+
+    for path in files:
+        # the other players log other utilities
+        for game in read_games(path, "VanGame"):
+            if held_out(path, game["game"], holdout) != test:
+                continue
+            x, y = game_data(game, discount_rate)
+            buf_x.append(x)
+            buf_y.append(y)
+            size += len(x)
+            if size >= buffer_size:
+                # keep half of the buffer to mix with the next games
+                size = yield from drain(buffer_size // 2)
+
+    if size:
+        yield from drain(0)
+
+
+class Network:
+    """
+    feed-forward network with the same arch / params layout as keras_model.dnn,
+    kept in float64 while training
+    """
+
+    def __init__(self, arch, params):
+        self.arch = arch
+        self.params = {k: np.array(v, dtype=np.float64) for k, v in params.items()}
+
+        for prop in arch:
+            if prop["activation"] not in ("relu", "linear"):
+                raise ValueError("cannot train a %s layer" % prop["activation"])
+
+    @classmethod
+    def build(cls, sizes, seed=0, outputs=1):
+        """ relu layers of `sizes` (input first), a linear output layer, he initialisation """
+        rs = np.random.RandomState(seed)
+        arch = []
+        params = {}
+        sizes = list(sizes) + [outputs]
+        for l in range(len(sizes) - 1):
+            n_in, n_out = sizes[l], sizes[l + 1]
+            arch.append({"input_size": n_in, "output_size": n_out,
+                         "activation": "linear" if l == len(sizes) - 2 else "relu"})
+            params['weight' + str(l)] = rs.randn(n_in, n_out) * np.sqrt(2.0 / n_in)
+            params['bias' + str(l)] = np.zeros(n_out)
+        return cls(arch, params)
+
+    @classmethod
+    def load(cls, filename):
+        """ start from a model keras_model.dnn can load """
+        arch, params = ker_m.load_model(filename, "float64")
+        return cls(arch, params)
+
+    def forward(self, x):
+        """ output and what backward needs, the input and pre-activation of every layer """
+        cache = []
+        for l, prop in enumerate(self.arch):
+            z = x @ self.params['weight' + str(l)] + self.params['bias' + str(l)]
+            cache.append((x, z))
+            x = utils.ReLu.forward(z) if prop["activation"] == "relu" else z
+        return x, cache
+
+    def predict(self, x):
+        return self.forward(np.asarray(x, dtype=np.float64))[0]
+
+    def backward(self, grad, cache):
+        """ gradients of the params given d loss / d output """
+        grads = {}
+        for l in reversed(range(len(self.arch))):
+            x, z = cache[l]
+            if self.arch[l]["activation"] == "relu":
+                grad = utils.ReLu.backward(grad, z)
+            grads['weight' + str(l)] = x.T @ grad
+            grads['bias' + str(l)] = grad.sum(axis=0)
+            grad = grad @ self.params['weight' + str(l)].T
+        return grads
+
+    def loss(self, x, y):
+        return float(np.mean((self.predict(x) - y) ** 2))
+
+    def train_batch(self, x, y, optimiser):
+        out, cache = self.forward(x)
+        diff = out - y
+        # d mean((out - y)^2) / d out
+        optimiser.step(self.params, self.backward(2 * diff / len(x), cache))
+        return float(np.mean(diff ** 2))
+
+    def step(self, x, grad, optimiser):
+        """ one optimiser step given d loss / d output at the inputs `x` """
+        _, cache = self.forward(np.asarray(x, dtype=np.float64))
+        optimiser.step(self.params, self.backward(grad, cache))
+
+    def save(self, filename):
+        ker_m.save_npz(filename, self.arch, self.params)
+
+
+class SGD:
+
+    def __init__(self, lr=1e-3):
+        self.lr = lr
+
+    def step(self, params, grads):
+        for k, g in grads.items():
+            params[k] -= self.lr * g
+
+
+class Adam:
+
+    def __init__(self, lr=1e-3, beta1=0.9, beta2=0.999, eps=1e-8):
+        self.lr = lr
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.m = {}
+        self.v = {}
+        self.t = 0
+
+    def step(self, params, grads):
+        self.t += 1
+        for k, g in grads.items():
+            if k not in self.m:
+                self.m[k] = np.zeros_like(g)
+                self.v[k] = np.zeros_like(g)
+            self.m[k] = self.beta1 * self.m[k] + (1 - self.beta1) * g
+            self.v[k] = self.beta2 * self.v[k] + (1 - self.beta2) * g * g
+            m = self.m[k] / (1 - self.beta1 ** self.t)
+            v = self.v[k] / (1 - self.beta2 ** self.t)
+            params[k] -= self.lr * m / (np.sqrt(v) + self.eps)
+
+
+def evaluate(network, files, batch_size=1024, discount_rate=config.DISCOUNT_RATE, holdout=0.0, test=False):
+    """ mean squared error over the examples of `files` (one side of the split, see batches) """
+    total = 0.0
+    n = 0
+    for x, y in batches(files, batch_size, batch_size, discount_rate, holdout=holdout, test=test):
+        total += float(np.sum((network.predict(x) - y) ** 2))
+        n += len(x)
+    return total / n if n else float("nan")
+
+
+def train(network, files, epochs=1, optimiser=None, batch_size=32, buffer_size=10000,
+          discount_rate=config.DISCOUNT_RATE, holdout=0.1, seed=0, verbose=True):
+    """
+    fit `network` to the logs in `files`, a `holdout` fraction of the games
+    is kept aside to report the test loss after every epoch
+    """
+    if optimiser is None:
+        optimiser = Adam()
+
+    rng = random.Random(seed)
+    files = list(files)
+
+    for epoch in range(epochs):
+        total = 0.0
+        n = 0
+        for x, y in batches(files, batch_size, buffer_size, discount_rate, rng, holdout):
+            total += network.train_batch(x, y, optimiser) * len(x)
+            n += len(x)
+
+        if verbose:
+            msg = "epoch %d train %.4g" % (epoch + 1, total / n if n else float("nan"))
+            if holdout > 0:
+                msg += " test %.4g" % evaluate(network, files, discount_rate=discount_rate, holdout=holdout,
+                                               test=True)
+            print(msg)
+
+    return network
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train the VanGame value network on game logs")
+    parser.add_argument("folders", nargs="*", default=["rec"], help="folders of VanGame game logs")
+    parser.add_argument("--init", default=None, help="start from this model (next to keras_model.py)")
+    parser.add_argument("--layers", default="100,200,100", help="hidden layer sizes of a new network")
+    parser.add_argument("--optimiser", choices=["adam", "sgd"], default="adam")
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--buffer", type=int, default=10000, help="examples held in memory for shuffling")
+    parser.add_argument("--discount", type=float, default=config.DISCOUNT_RATE)
+    parser.add_argument("--holdout", type=float, default=0.1, help="fraction of games kept to test on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="value_model.npz", help="saved next to keras_model.py")
+    args = parser.parse_args()
+
+    if args.init:
+        network = Network.load(args.init)
+    else:
+        hidden = [int(h) for h in args.layers.split(",") if h]
+        network = Network.build([11] + hidden, args.seed)
+
+    optimiser = Adam(args.lr) if args.optimiser == "adam" else SGD(args.lr)
+
+    files = log_files(args.folders)
+    print("train %d games, %d positions" % count_games(files, holdout=args.holdout))
+    print("test %d games, %d positions" % count_games(files, holdout=args.holdout, test=True))
+
+    train(network, files, args.epochs, optimiser, args.batch, args.buffer, args.discount, args.holdout, args.seed)
+
+    network.save(os.path.join(ker_m.MODEL_DIR, args.out))
+
+
+if __name__ == "__main__":
+    main()
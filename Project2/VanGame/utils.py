@@ -1,7 +1,6 @@
 import numpy as np
-import os
-import json
 import VanGame.config as config
+import shared.gamelog as gamelog
 import math
 
 
@@ -127,37 +126,29 @@ def discount_rewards(rewards, discount_rate):
     discounted_rewards = np.empty(len(rewards))
     cumulative_reward = 0
     for step in reversed(range(len(rewards))):
-        cumulative_rewards = rewards[step] + cumulative_reward * discount_rate
-        discounted_rewards[step] = cumulative_rewards
+        cumulative_reward = rewards[step] + cumulative_reward * discount_rate
+        discounted_rewards[step] = cumulative_reward
     return discounted_rewards
 
 
-def load_l(path):
-    rex = {'green': 1, 'red': 2, 'blue': 3, 'empty': 0}
-    fn = os.path.basename(path)
-    a_ca = fn.split("cao")
-    t = a_ca[1]
-    colour = t[:t.index("jiba")]
-
-    with open(path, "r") as f:
-        data = json.load(f)
-        for m in range(len(data)):
-            data[m]["board"] = {to_array(a): rex[data[m]["board"][a]] for a in data[m]["board"].keys()}
-
-        datafin = data
-    
-    return datafin, rex[colour]
-
+def load_l(path, game=0):
+    """
+    the turns of the `game`-th game of a log (.glog, logger .txt or .jsonl,
+    see gamelog.read), boards as {(q, r): code}, and the code of its colour
+    """
+    for i, cols in enumerate(gamelog.read(path)):
+        if i == game:
+            data = gamelog.to_log(cols)
+            for m in range(len(data)):
+                data[m]["board"] = {c: int(v) for c, v in zip(gamelog.CELLS, cols["board"][m])}
 
-def to_array(s_t):
-    split_dict = s_t.split(", ")
-    first = split_dict[0][1:]
-    secon = split_dict[1][:-1]
+            return data, gamelog.CODE[cols["colour"]]
 
-    return (int(first), int(secon))
+    raise ValueError("%s has no game %d" % (path, game))
 
 
-def chose(options: list):
+def chose(options: list, rng=None):
+    """ index of one option, drawn by the softmax of their values (from `rng` if given) """
     ops = np.array(options)
     #ops = (ops - ops.mean()) / ops.std()
     prob = softmax(np.array(ops))
@@ -165,7 +156,9 @@ def chose(options: list):
     prob = prob.reshape(len(prob),)
     # print(prob.shape)
 
-    return np.random.choice(len(options), 1, p=prob)[0]
+    if rng is None:
+        rng = np.random
+    return rng.choice(len(options), 1, p=prob)[0]
     # return np.argmax(prob)
 
 
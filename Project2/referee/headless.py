@@ -0,0 +1,107 @@
+"""
+Play games of Chexers without any output, for running many games in a row
+(e.g. tuning weights or self-play). Players are constructed directly, so
+there are no time or space limits, and their own printing is thrown away.
+"""
+
+import os
+import random
+import importlib
+import contextlib
+
+import numpy as np
+
+from referee.game import Chexers
+
+_COLOURS = ['red', 'green', 'blue']
+
+
+def load_player(package_name, class_name="Player"):
+    """Load a Player class given the name of a package."""
+    return getattr(importlib.import_module(package_name), class_name)
+
+
+def make_players(specs, quiet=True):
+    """
+    Construct one player per colour. Each spec is a package name or a
+    (package name, keyword arguments) pair. Players that keep a game log
+    (strategy.logger) are told not to export it.
+    """
+    players = []
+    with _silence(quiet):
+        for colour, spec in zip(_COLOURS, specs):
+            if isinstance(spec, str):
+                spec = (spec, {})
+            package_name, kwargs = spec
+            player = load_player(package_name)(colour, **kwargs)
+
+            logger = getattr(getattr(player, "strategy", None), "logger", None)
+            if logger is not None:
+                logger.save = False
+            players.append(player)
+    return players
+
+
+def play(players, opening=0, seed=None, quiet=True):
+    """
+    Play one game between three constructed players (red, green, blue).
+    The first `opening` actions are random legal actions (seeded by `seed`)
+    instead of the players' own, to start games from different positions.
+    Players whose strategy draws its actions from a NumPy generator
+    (strategy.rng) get one seeded from `seed` too, so the same seed plays
+    the same game.
+
+    Returns a dict with the winner's colour (None for a draw), the number
+    of exits of each colour, the number of turns and the draw message.
+    """
+    rng = random.Random(seed)
+    game = Chexers()
+
+    if seed is not None:
+        for colour, player in zip(_COLOURS, players):
+            strategy = getattr(player, "strategy", None)
+            if hasattr(strategy, "rng"):
+                bits = random.Random("%s-%s" % (seed, colour)).getrandbits(64)
+                strategy.rng = np.random.default_rng(bits)
+
+    with _silence(quiet):
+        turn = 0
+        while not game.over():
+            colour = _COLOURS[turn % 3]
+            if turn < opening:
+                action = rng.choice(game._available_actions(colour[0]))
+            else:
+                action = players[turn % 3].action()
+
+            game.update(colour, action)
+            for player in players:
+                player.update(colour, action)
+            turn += 1
+        game.end()
+
+    score = {c: game.score[c[0]] for c in _COLOURS}
+    winner = None
+    if not game.drawmsg:
+        winner = max(_COLOURS, key=lambda c: score[c])
+
+    return {
+        "winner": winner,
+        "score": score,
+        "turns": game.nturns,
+        "draw": game.drawmsg,
+    }
+
+
+def play_game(specs, opening=0, seed=None, quiet=True):
+    """Construct the players from `specs` (see make_players) and play."""
+    return play(make_players(specs, quiet), opening, seed, quiet)
+
+
+@contextlib.contextmanager
+def _silence(quiet):
+    if quiet:
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                yield
+    else:
+        yield
@@ -0,0 +1,7 @@
+'''
+    modules HardCode, VanGame and Intelligent all play with: the distance
+    tables, bitboards, the evaluation and its cache, and the game logs.
+
+    nothing in here imports a player package, the tuning (weights, cache
+    size) comes from each player's own config.py.
+'''
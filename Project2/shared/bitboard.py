@@ -0,0 +1,139 @@
+import shared.config as config
+
+COLOURS = ["red", "green", "blue"]
+
+'''
+    cells as bits of an int.
+
+    cell (q, r) is bit (q + 3) * WIDTH + (r + 3). a row is one cell wider than
+    the board so a step off the left or right edge lands on an unused bit
+    instead of wrapping onto the next row; BOARD_MASK throws those away.
+'''
+
+WIDTH = 8
+
+BIT = {c: 1 << ((c[0] + 3) * WIDTH + (c[1] + 3)) for c in config.CELLS}
+
+BOARD_MASK = 0
+for _b in BIT.values():
+    BOARD_MASK |= _b
+
+# delta x and y from any position to its neighbourhood
+DIRECTIONS = [
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 1),
+    (-1, 0)
+]
+
+# jump-threat table: an attacker at victim - d lands on victim + d, which on
+# this layout is the same bit shift for every cell, so one offset per direction
+OFFSETS = [d[0] * WIDTH + d[1] for d in DIRECTIONS]
+
+
+def shift(mask, offset):
+    """ move every cell in `mask` by `offset` bits, off-board cells are dropped """
+    if offset >= 0:
+        return (mask << offset) & BOARD_MASK
+    return mask >> -offset
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+# int.bit_count is much faster where there is one (python 3.10+)
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+
+
+def masks(current_board):
+    """ occupancy mask of each colour """
+    res = {c: 0 for c in COLOURS}
+    for cell, p in current_board.items():
+        if p != "empty":
+            res[p] |= BIT[cell]
+    return res
+
+
+def threatened(own, others):
+    """
+    pieces in `own` that some piece in `others` could take with one JUMP,
+    i.e. attacker on one side and an empty cell on the other
+    """
+    empty = BOARD_MASK & ~(own | others)
+    threat = 0
+    for off in OFFSETS:
+        threat |= shift(others, off) & shift(empty, -off)
+    return own & threat
+
+
+def danger(board_masks, colour):
+    """ number of pieces of `colour` in danger, same as HardCode.utils.cal_dpiei """
+    others = 0
+    for c in COLOURS:
+        if c != colour:
+            others |= board_masks[c]
+    return popcount(threatened(board_masks[colour], others))
+
+
+# goal cells of each colour
+GOAL_MASK = {c: 0 for c in COLOURS}
+for _c in COLOURS:
+    for _g in config.GOALS[_c]:
+        GOAL_MASK[_c] |= BIT[_g]
+
+
+def mobility(own, occupied):
+    """ number of MOVE and JUMP actions the pieces in `own` have """
+    empty = BOARD_MASK & ~occupied
+    n = 0
+    for off in OFFSETS:
+        step = shift(own, off)
+        # jump over the occupied ones. a step past the edge ends up in the
+        # spare column, which is never occupied, so it cannot jump on
+        n += popcount(step & empty) + popcount(shift(step & occupied, off) & empty)
+    return n
+
+
+def reach_hist(own, occupied, goal, limit):
+    """
+    fewest turns (single MOVE or JUMP each) for every piece in `own` to get to
+    a cell in `goal`, with all the other pieces staying where they are.
+
+    flood fills back from the free goal cells one turn at a time. returns
+    hist[k] = # of pieces needing k - 1 turns (so k counts the EXIT as well,
+    like HardCode config.COST), pieces that cannot get there within `limit` turns are
+    counted at limit + 2.
+    """
+    empty = BOARD_MASK & ~occupied
+    hist = [0] * (limit + 3)
+
+    reached = goal & (empty | own)
+    seen = 0
+
+    for k in range(limit + 1):
+        new = own & reached & ~seen
+        if new:
+            hist[k + 1] += popcount(new)
+            seen |= new
+        if seen == own:
+            return hist
+
+        # a piece can only land on an empty cell
+        land = reached & empty
+        grow = 0
+        for off in OFFSETS:
+            step = shift(land, -off)
+            # one more step back over an occupied cell is a jump
+            grow |= step | shift(step & occupied, -off)
+        grow &= BOARD_MASK & ~reached
+
+        if not grow:
+            break
+        reached |= grow
+
+    hist[limit + 2] += popcount(own & ~seen)
+    return hist
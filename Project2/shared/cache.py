@@ -0,0 +1,73 @@
+import shared.config as config
+from collections import OrderedDict
+import random
+
+COLOURS = ["red", "green", "blue"]
+
+# random number for each (cell, colour), the hash of a board is the xor of
+# the numbers of its pieces so one move only changes a couple of them
+_rand = random.Random(30024)
+ZOBRIST = {(cell, c): _rand.getrandbits(64) for cell in config.CELLS for c in COLOURS}
+
+
+def board_hash(current_board):
+    h = 0
+    for cell, p in current_board.items():
+        if p != "empty":
+            h ^= ZOBRIST[(cell, p)]
+    return h
+
+
+def exits_key(colour_e):
+    return tuple([colour_e[c] for c in COLOURS])
+
+
+class EvalCache:
+    """
+    evaluations of positions seen before, the least recently used ones are
+    dropped once there are more than `size` of them
+    """
+
+    def __init__(self, size, enabled=True):
+        self.size = size
+        self.enabled = enabled
+
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """ cached value of `key`, None if not there (or the cache is off) """
+        if not self.enabled:
+            return None
+
+        value = self.table.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(key)
+
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+
+        self.table[key] = value
+        self.table.move_to_end(key)
+
+        if len(self.table) > self.size:
+            self.table.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.table.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.table)
@@ -0,0 +1,31 @@
+'''
+    the board, what the shared modules need of it, the same as in the
+    players' config.py
+'''
+
+COLOURS = ["red", "green", "blue"]
+
+# define the boundary of the board
+CELLS = sorted([(q, r) for q in range(-3, +3 + 1) for r in range(-3, +3 + 1) if -q - r in range(-3, +3 + 1)])
+
+# goals of players in each color
+GOALS = {
+        "red": [
+            (3, -3),
+            (3, -2),
+            (3, -1),
+            (3, 0)
+        ],
+        "green": [
+            (-3, 3),
+            (-2, 3),
+            (-1, 3),
+            (0, 3)
+        ],
+        "blue": [
+            (0, -3),
+            (-1, -2),
+            (-2, -1),
+            (-3, 0)
+        ]
+    }
@@ -0,0 +1,111 @@
+from collections import deque
+
+'''
+    distance tables (the COST heuristic) from goal cells.
+
+    a BFS out of every goal over the precomputed steps of each cell, on the
+    empty board or with any set of occupied cells. the value of a cell is
+    the number of MOVEs on the first path the BFS finds from the closest goal
+    plus 1, JUMPs are free (same as the cost_from_goal this replaces).
+
+    tables are lists indexed by cell id (position in CELLS), None where no
+    goal can be reached.
+'''
+
+# define the boundary of the board
+CELLS = sorted([(q, r) for q in range(-3, +3 + 1) for r in range(-3, +3 + 1) if -q - r in range(-3, +3 + 1)])
+
+CELL_ID = {c: i for i, c in enumerate(CELLS)}
+
+N_CELLS = len(CELLS)
+
+# delta x and y from any position to its neighbourhood, in the order find_next tries them
+DIRECTIONS = [
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 1),
+    (-1, 0)
+]
+
+# STEPS[i] = [(neighbour id, jump landing id), ...] for the directions that stay on the board
+STEPS = []
+for _c in CELLS:
+    _steps = []
+    for _dq, _dr in DIRECTIONS:
+        _n = CELL_ID.get((_c[0] + _dq, _c[1] + _dr))
+        if _n is not None:
+            _steps.append((_n, CELL_ID.get((_c[0] + 2 * _dq, _c[1] + 2 * _dr))))
+    STEPS.append(_steps)
+
+
+def occupancy(cells):
+    """ occupied cells (coordinates) as a list of bool indexed by cell id """
+    occupied = [False] * N_CELLS
+    for c in cells:
+        occupied[CELL_ID[c]] = True
+    return occupied
+
+
+def from_goal(goal, occupied, table):
+    """
+    BFS out of cell id `goal`, keeping the smaller value in `table` for every
+    cell it gets to. a step is a MOVE to an empty neighbour, or else a JUMP
+    over it to an empty cell
+    """
+    seen = [False] * N_CELLS
+    moves = [0] * N_CELLS
+
+    seen[goal] = True
+    table[goal] = 1
+
+    q = deque([goal])
+
+    while q:
+        current = q.popleft()
+
+        for n, j in STEPS[current]:
+            if not occupied[n]:
+                nxt, m = n, moves[current] + 1
+            elif j is not None and not occupied[j]:
+                nxt, m = j, moves[current]
+            else:
+                continue
+
+            if seen[nxt]:
+                continue
+
+            seen[nxt] = True
+            moves[nxt] = m
+            q.append(nxt)
+
+            if table[nxt] is None or table[nxt] > m + 1:
+                table[nxt] = m + 1
+
+    return table
+
+
+def cost_table(goals, occupied=None):
+    """
+    table for the goal cells `goals` (coordinates), `occupied` is a list of
+    bool by cell id (see occupancy), the empty board if not given
+    """
+    if occupied is None:
+        occupied = [False] * N_CELLS
+
+    table = [None] * N_CELLS
+    for g in goals:
+        from_goal(CELL_ID[g], occupied, table)
+
+    return table
+
+
+def cost_tables(goals, occupied=None):
+    """ one table per colour, goals is {colour: [goal cells]} """
+    return {c: cost_table(goals[c], occupied) for c in goals}
+
+
+def as_dict(table):
+    """ {cell: value} for the cells that can reach a goal """
+    return {c: table[i] for i, c in enumerate(CELLS) if table[i] is not None}
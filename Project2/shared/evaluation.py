@@ -0,0 +1,150 @@
+import numpy as np
+import json
+
+'''
+    evaluation of a successor as a dot product of weights and features.
+
+    features (N_FEATURES of them):
+        0       1 if the action is an EXIT
+        1       reduced heuristic of the other colours (others)
+        2-6     t < 4:  pieces difference, reduced heuristic, pieces in danger,
+                        max(0, pieces difference), others
+        7-11    t == 4: same five
+        12-16   t > 4:  same five
+        17      reachability, turns to the goals on the current board (HardCode.utils.cal_reach)
+        18      mobility, # of MOVE and JUMP actions (HardCode.utils.cal_mobility)
+    where t is the number of pieces on the board plus the exited ones, only
+    the block of the matching t is filled, the other two stay 0.
+
+    weights saved before reach and mobility (the first REACH) get 0 for both,
+    and the two are only calculated while their weight is not 0 (see
+    Evaluation.uses_reach, HardCode.utils.reach_mobility).
+'''
+
+BRANCH = 5
+REACH = 2 + 3 * BRANCH
+MOBILITY = REACH + 1
+N_FEATURES = MOBILITY + 1
+
+# score of a successor once all 4 pieces are out
+WIN = 99999
+
+
+def features(pieces_difference, reduced_heuristic, danger_pieces, t, exit_action, others, reach=0, mobility=0):
+    f = [0.0] * N_FEATURES
+
+    f[0] = 1.0 if exit_action else 0.0
+    f[1] = others
+
+    if t < 4:
+        b = 2
+    elif t == 4:
+        b = 2 + BRANCH
+    else:
+        b = 2 + 2 * BRANCH
+
+    f[b] = pieces_difference
+    f[b + 1] = reduced_heuristic
+    f[b + 2] = danger_pieces
+    f[b + 3] = max(0, pieces_difference)
+    f[b + 4] = others
+
+    f[REACH] = reach
+    f[MOBILITY] = mobility
+
+    return f
+
+
+def load_weights(filename):
+    """ weights from a json file, either a list or {"weights": [...]} """
+    with open(filename) as f:
+        weights = json.load(f)
+
+    if isinstance(weights, dict):
+        weights = weights["weights"]
+
+    return weights
+
+
+def pad(weights):
+    """ weights of the first REACH features only (older files) with 0 for reach and mobility """
+    weights = list(weights)
+    if len(weights) == REACH:
+        weights += [0.0] * (N_FEATURES - REACH)
+    return weights
+
+
+class Evaluation:
+    """
+    weighted sum of the features above, the weights come from `weights`
+    (e.g. a player's config.EVAL_WEIGHTS) or else a json file
+    """
+
+    def __init__(self, weights=None, filename=None):
+        if weights is None and filename is not None:
+            weights = load_weights(filename)
+        if weights is None:
+            raise ValueError("no weights or weight file given")
+
+        self.weights = np.asarray(pad(weights), dtype=np.float64)
+
+        if self.weights.shape != (N_FEATURES, ):
+            raise ValueError("expected %d (or %d) weights, got %s" % (N_FEATURES, REACH, self.weights.shape))
+
+        # plain floats for scoring one successor at a time
+        self._w = self.weights.tolist()
+
+        # the two bitboard features cost a flood fill and a move count per successor
+        self.uses_reach = self._w[REACH] != 0
+        self.uses_mobility = self._w[MOBILITY] != 0
+
+    def features(self, pieces_difference, reduced_heuristic, danger_pieces, players, player_exit, action, other_rheu,
+                 reach=0, mobility=0):
+        t = len(players) + player_exit
+        others = sum(other_rheu.values()) if other_rheu else 0
+
+        return features(pieces_difference, reduced_heuristic, danger_pieces, t, action[0] == "EXIT", others,
+                        reach, mobility)
+
+    def score(self, pieces_difference, reduced_heuristic, danger_pieces, players, player_exit, action, other_rheu=None,
+              reach=0, mobility=0):
+        """
+        takes the same arguments as HardCode.utils.hard_code_eva_function
+        """
+        if player_exit == 4:
+            return WIN
+
+        t = len(players) + player_exit
+        others = sum(other_rheu.values()) if other_rheu else 0
+
+        if t < 4:
+            b = 2
+        elif t == 4:
+            b = 2 + BRANCH
+        else:
+            b = 2 + 2 * BRANCH
+
+        # dot product with features(...), only over the entries that can be non zero.
+        # numpy only pays off for many rows at once, see score_many
+        w = self._w
+        res = w[1] * others + w[b] * pieces_difference + w[b + 1] * reduced_heuristic + \
+            w[b + 2] * danger_pieces + w[b + 3] * max(0, pieces_difference) + w[b + 4] * others + \
+            w[REACH] * reach + w[MOBILITY] * mobility
+        if action[0] == "EXIT":
+            res += w[0]
+
+        return res
+
+    def score_many(self, features, weights=None):
+        """
+        scores of a batch of feature rows (N, N_FEATURES).
+        `weights` can be a (K, N_FEATURES) set of weight vectors, giving (N, K)
+        """
+        if weights is None:
+            weights = self.weights
+
+        return np.asarray(features, dtype=np.float64) @ np.asarray(weights, dtype=np.float64).T
+
+    def save(self, filename):
+        with open(filename, "w") as f:
+            json.dump({"weights": self.weights.tolist()}, f)
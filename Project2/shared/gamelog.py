@@ -0,0 +1,346 @@
+import numpy as np
+import argparse
+import json
+import os
+
+'''
+    binary columnar game logs (.glog), what Logger.export_log and the
+    self-play farm write.
+
+    a file holds any number of games (one player's log each) with every
+    field of every turn as a column of fixed width, so a file of a million
+    positions is read by mapping it, not by parsing it:
+
+        board       uint8   (turns, 37)  one cell per byte, CELLS order, CODE
+        action      int8    (turns, 5)   ACTIONS index, from q, r, to q, r
+        rew         float32 (turns,)
+        d_heur      float32 (turns,)
+        ev          float32 (turns,)
+        turns       uint16  (turns,)
+        utility     float32 (turns, width)   NaN past the game's own width
+        features    float32 (turns, 19)      NaN if not logged (only HardCode), the
+                                             column is left out if no game has them
+
+    and per game
+        start       int64   (games + 1,)  first turn of each game, then the total
+        colour      uint8   (games,)      COLOURS index
+        outcome     int8    (games,)      1 win, 0 draw, -1 loss
+        package     uint8   (games,)      index in the header's package list
+        game        int64   (games,)      number of the game it was played in
+        width       uint8   (games,)      # of utility columns of the game
+
+    layout: MAGIC, header length (uint64), the json header {"columns": {name:
+    [dtype, shape, offset]}, "packages": [...]}, then the columns, each on
+    ALIGN bytes.
+
+    one game is handed around as a dict of its columns (see GameLog.game and
+    from_log), with the logger's list of dicts only as input.
+
+        python -m shared.gamelog convert rec --out rec.glog
+'''
+
+MAGIC = b"CHXGLOG1"
+ALIGN = 64
+
+COLOURS = ["red", "green", "blue"]
+COLOUR_ID = {c: i for i, c in enumerate(COLOURS)}
+
+# cell codes, the ones VanGame.utils.load_l gives
+CODE = {"empty": 0, "green": 1, "red": 2, "blue": 3}
+CODE_NAME = {v: k for k, v in CODE.items()}
+
+ACTIONS = ["NONE", "MOVE", "JUMP", "EXIT", "PASS"]
+ACTION_ID = {a: i for i, a in enumerate(ACTIONS)}
+
+CELLS = sorted([(q, r) for q in range(-3, +3 + 1) for r in range(-3, +3 + 1) if -q - r in range(-3, +3 + 1)])
+
+# the board keys of the old json logs
+CELL_KEY = {str(c): i for i, c in enumerate(CELLS)}
+
+N_FEATURES = 19
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+TURN_COLUMNS = ["board", "action", "rew", "d_heur", "ev", "turns", "utility", "features"]
+
+
+def encode_board(board):
+    """ bytes of the cell codes of a board {cell: colour}, what Logger keeps per turn """
+    return bytes([CODE[board[c]] for c in CELLS])
+
+
+def decode_board(row):
+    return {c: CODE_NAME[int(v)] for c, v in zip(CELLS, row)}
+
+
+def encode_action(action):
+    if action is None or action[0] is None:
+        return [0, 0, 0, 0, 0]
+
+    kind = str(action[0]).upper()
+    res = [ACTION_ID.get(kind, 0), 0, 0, 0, 0]
+    if kind in ("MOVE", "JUMP"):
+        (q1, r1), (q2, r2) = action[1]
+        res[1:] = [q1, r1, q2, r2]
+    elif kind == "EXIT":
+        res[1:3] = action[1]
+    return res
+
+
+def decode_action(row):
+    kind = ACTIONS[row[0]]
+    if kind in ("MOVE", "JUMP"):
+        return kind, ((int(row[1]), int(row[2])), (int(row[3]), int(row[4])))
+    if kind == "EXIT":
+        return kind, (int(row[1]), int(row[2]))
+    return kind, None
+
+
+def _board_row(board):
+    if isinstance(board, (bytes, bytearray)):
+        return np.frombuffer(board, dtype=np.uint8)
+
+    # old json logs, {"(q, r)": colour}
+    row = np.zeros(len(CELLS), dtype=np.uint8)
+    for k, v in board.items():
+        key = k if isinstance(k, str) else str(tuple(k))
+        row[CELL_KEY[key]] = CODE[v]
+    return row
+
+
+def from_log(log, colour="red", outcome=LOSS, package="", game=0):
+    """ the columns of one game from a Logger.log (list of dicts) """
+    n = len(log)
+    width = max([len(l.get("utility") or []) for l in log] + [0])
+
+    cols = {
+        "board": np.zeros((n, len(CELLS)), dtype=np.uint8),
+        "action": np.zeros((n, 5), dtype=np.int8),
+        "rew": np.zeros(n, dtype=np.float32),
+        "d_heur": np.zeros(n, dtype=np.float32),
+        "ev": np.zeros(n, dtype=np.float32),
+        "turns": np.zeros(n, dtype=np.uint16),
+        "utility": np.full((n, width), np.nan, dtype=np.float32),
+        "features": np.full((n, N_FEATURES), np.nan, dtype=np.float32),
+    }
+
+    for t, l in enumerate(log):
+        cols["board"][t] = _board_row(l["board"])
+        cols["action"][t] = encode_action(l.get("action"))
+        cols["rew"][t] = l.get("rew", 0)
+        cols["d_heur"][t] = l.get("d_heur", 0)
+        cols["ev"][t] = l.get("ev", 0)
+        cols["turns"][t] = l.get("turns", 0)
+        u = l.get("utility") or []
+        cols["utility"][t, :len(u)] = u
+        if l.get("features") is not None:
+            cols["features"][t] = l["features"]
+
+    cols.update({"colour": colour, "outcome": outcome, "package": package, "game": game, "width": width})
+    return cols
+
+
+def to_log(cols):
+    """ the columns of one game back as a Logger.log """
+    res = []
+    width = cols["width"]
+    for t in range(len(cols["rew"])):
+        entry = {
+            "colour": cols["colour"],
+            "board": decode_board(cols["board"][t]),
+            "action": decode_action(cols["action"][t]),
+            "utility": cols["utility"][t, :width].tolist(),
+            "rew": float(cols["rew"][t]),
+            "d_heur": float(cols["d_heur"][t]),
+            "ev": float(cols["ev"][t]),
+            "turns": int(cols["turns"][t]),
+        }
+        if not np.isnan(cols["features"][t, 0]):
+            entry["features"] = cols["features"][t].tolist()
+        res.append(entry)
+    return res
+
+
+def write(path, games):
+    """
+    write `games` (columns of each game, see from_log) to `path`. written to
+    a temporary file first, so a reader never sees half a file
+    """
+    if not games:
+        raise ValueError("no games to write to %s" % path)
+
+    packages = sorted(set(g["package"] for g in games))
+    width = max([g["width"] for g in games] + [0])
+
+    lengths = [len(g["rew"]) for g in games]
+    start = np.zeros(len(games) + 1, dtype=np.int64)
+    start[1:] = np.cumsum(lengths)
+
+    columns = {"start": start}
+    for name in TURN_COLUMNS:
+        parts = [g[name] for g in games]
+        if name == "features" and all(np.isnan(p).all() for p in parts):
+            # VanGame does not log them
+            continue
+        if name == "utility":
+            parts = [np.pad(p, ((0, 0), (0, width - p.shape[1])), constant_values=np.nan) for p in parts]
+        columns[name] = np.ascontiguousarray(np.concatenate(parts))
+
+    columns["colour"] = np.array([COLOUR_ID[g["colour"]] for g in games], dtype=np.uint8)
+    columns["outcome"] = np.array([g["outcome"] for g in games], dtype=np.int8)
+    columns["package"] = np.array([packages.index(g["package"]) for g in games], dtype=np.uint8)
+    columns["game"] = np.array([g["game"] for g in games], dtype=np.int64)
+    columns["width"] = np.array([g["width"] for g in games], dtype=np.uint8)
+
+    # offsets are from the end of the header, so its own length does not matter
+    offset = 0
+    layout = {}
+    for name, a in columns.items():
+        layout[name] = [a.dtype.str, list(a.shape), offset]
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+
+    header = json.dumps({"columns": layout, "packages": packages}).encode()
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, a in columns.items():
+            f.write(a.tobytes())
+            f.write(b"\0" * (-a.nbytes % ALIGN))
+    os.replace(tmp, path)
+
+
+class GameLog:
+    """ a .glog file, every column mapped read only """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a game log" % path)
+            size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(size))
+
+        base = len(MAGIC) + 8 + size
+        self.packages = header["packages"]
+        self.columns = {}
+        for name, (dtype, shape, offset) in header["columns"].items():
+            if np.prod(shape) == 0:
+                self.columns[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=base + offset, shape=tuple(shape))
+
+    def __len__(self):
+        return len(self.columns["colour"])
+
+    @property
+    def positions(self):
+        return int(self.columns["start"][-1])
+
+    def game(self, i):
+        """ columns of the i-th game (views into the file) """
+        a, b = self.columns["start"][i], self.columns["start"][i + 1]
+        width = int(self.columns["width"][i])
+
+        cols = {name: self.columns[name][a:b] for name in TURN_COLUMNS if name in self.columns}
+        cols["utility"] = cols["utility"][:, :width]
+        if "features" not in cols:
+            cols["features"] = np.full((b - a, N_FEATURES), np.nan, dtype=np.float32)
+        cols.update({
+            "colour": COLOURS[self.columns["colour"][i]],
+            "outcome": int(self.columns["outcome"][i]),
+            "package": self.packages[self.columns["package"][i]],
+            "game": int(self.columns["game"][i]),
+            "width": width
+        })
+        return cols
+
+    def games(self, package=None):
+        for i in range(len(self)):
+            if package is None or self.packages[self.columns["package"][i]] == package:
+                yield self.game(i)
+
+
+def read_json(path):
+    """
+    columns of the games in an old json log: a logger file (colour and result
+    in the name, e.g. [1win]1557044414.0caoredjiba.txt) or a .jsonl shard
+    """
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                yield from_log(r["log"], r["colour"], r["outcome"], r["package"], r["game"])
+        return
+
+    try:
+        with open(path) as f:
+            log = json.load(f)
+    except ValueError:
+        return
+
+    fn = os.path.basename(path)
+    colour = log[0].get("colour", "red") if log else "red"
+    if "cao" in fn and "jiba" in fn:
+        colour = fn.split("cao")[1].split("jiba")[0]
+    yield from_log(log, colour, WIN if "[1win]" in fn else LOSS, "", 0)
+
+
+def read(path, package=None):
+    """ columns of every game in a .glog, logger .txt or .jsonl file """
+    if path.endswith(".glog"):
+        yield from GameLog(path).games(package)
+        return
+
+    for g in read_json(path):
+        if package is None or not g["package"] or g["package"] == package:
+            yield g
+
+
+def convert(paths, out):
+    """ write the games of old json logs `paths` to one .glog """
+    games = []
+    for path in paths:
+        games += list(read_json(path))
+    write(out, games)
+    return len(games), sum(len(g["rew"]) for g in games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="binary game logs")
+    sub = parser.add_subparsers(dest="command")
+    conv = sub.add_parser("convert", help="json logs (.txt, .jsonl or folders of them) to one .glog")
+    conv.add_argument("paths", nargs="+")
+    conv.add_argument("--out", required=True)
+    info = sub.add_parser("info", help="games and positions in .glog files")
+    info.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        paths = []
+        for p in args.paths:
+            if os.path.isdir(p):
+                paths += [os.path.join(p, fn) for fn in sorted(os.listdir(p)) if fn.endswith((".txt", ".jsonl"))]
+            else:
+                paths.append(p)
+        games, positions = convert(paths, args.out)
+        print("%d games, %d positions to %s" % (games, positions, args.out))
+    elif args.command == "info":
+        for p in args.paths:
+            g = GameLog(p)
+            print("%s: %d games, %d positions, packages %s" % (p, len(g), g.positions, g.packages))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()